@@ -1,11 +1,26 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import products, search
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Blocking embedding and pgvector calls run via asyncio.to_thread;
+    # give them a pool wide enough for concurrent searches
+    executor = ThreadPoolExecutor(max_workers=32)
+    asyncio.get_running_loop().set_default_executor(executor)
+    yield
+    executor.shutdown(wait=False)
 
 app = FastAPI(
     title="AI Product Search API",
     description="Semantic product search powered by LangChain and vector embeddings",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware for React frontend
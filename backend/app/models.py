@@ -28,6 +28,10 @@ class Product(BaseModel):
             }
         }
 
+# Upper bound on queries per /batch request: each one joins a single
+# embedding forward pass and a concurrent vector lookup
+MAX_BATCH_QUERIES = 32
+
 class SearchQuery(BaseModel):
     """Search request model"""
     query: str = Field(..., min_length=1, max_length=500)
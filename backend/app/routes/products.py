@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from typing import List
+from collections import defaultdict
 from app.models import Product
-import json
+import orjson
 import os
 
 router = APIRouter()
@@ -11,13 +12,19 @@ def load_products():
     """Load products from JSON file"""
     data_path = os.path.join(os.path.dirname(__file__), "../../data/products.json")
     try:
-        with open(data_path, 'r') as f:
-            return json.load(f)
+        with open(data_path, 'rb') as f:
+            return orjson.loads(f.read())
     except FileNotFoundError:
         return []
 
 PRODUCTS = load_products()
 
+# Lookup tables built once at load time
+PRODUCTS_BY_ID = {p["id"]: p for p in PRODUCTS}
+PRODUCTS_BY_CATEGORY = defaultdict(list)
+for p in PRODUCTS:
+    PRODUCTS_BY_CATEGORY[p.get("category", "").lower()].append(p)
+
 @router.get("/", response_model=List[Product])
 async def get_all_products(skip: int = 0, limit: int = 20):
     """Get all products with pagination"""
@@ -26,7 +33,7 @@ async def get_all_products(skip: int = 0, limit: int = 20):
 @router.get("/{product_id}", response_model=Product)
 async def get_product(product_id: str):
     """Get single product by ID"""
-    product = next((p for p in PRODUCTS if p["id"] == product_id), None)
+    product = PRODUCTS_BY_ID.get(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
@@ -34,5 +41,5 @@ async def get_product(product_id: str):
 @router.get("/category/{category}", response_model=List[Product])
 async def get_products_by_category(category: str):
     """Get products by category"""
-    filtered = [p for p in PRODUCTS if p.get("category", "").lower() == category.lower()]
-    return filtered
\ No newline at end of file
+    # .get so unknown categories don't add empty entries to the table
+    return PRODUCTS_BY_CATEGORY.get(category.lower(), [])
\ No newline at end of file
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from app.models import SearchQuery, SearchResponse, SearchResult
-from app.services.search_service import SearchService
-from typing import Optional
+from fastapi import APIRouter, Body, HTTPException
+from app.models import MAX_BATCH_QUERIES, SearchQuery, SearchResponse, SearchResult
+from app.services.search_service import get_search_service
+from typing import Annotated, List, Optional
+import asyncio
 import time
 
 router = APIRouter()
-search_service = SearchService() 
+search_service = get_search_service()
 
 @router.post("", response_model=SearchResponse)
 async def semantic_search(
@@ -19,32 +20,20 @@ async def semantic_search(
     start_time = time.time()
     
     try:
-        # Get search results
-        results = await search_service.search(query.query, query.limit * 2)
-        
-        # Apply filters
-        filtered_results = []
-        for result in results:
-            product = result.product
-            
-            # Category filter
-            if category and product.category.lower() != category.lower():
-                continue
-            
-            # Price filters
-            if min_price and product.price < min_price:
-                continue
-            if max_price and product.price > max_price:
-                continue
-            
-            # Rating filter
-            if min_rating and (not product.rating or product.rating < min_rating):
-                continue
-            
-            filtered_results.append(result)
-        
-        # Limit results
-        filtered_results = filtered_results[:query.limit]
+        if category or min_price or max_price or min_rating:
+            # Filters run inside the vector query, which keeps scanning until `limit` rows match
+            results = await asyncio.to_thread(
+                search_service.vector_store.search_filtered,
+                query.query,
+                query.limit,
+                category=category,
+                min_price=min_price,
+                max_price=max_price,
+                min_rating=min_rating
+            )
+            filtered_results = search_service.to_search_results(results)
+        else:
+            filtered_results = await search_service.search(query.query, query.limit)
         
         processing_time = time.time() - start_time
         
@@ -57,6 +46,41 @@ async def semantic_search(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/batch", response_model=List[SearchResponse])
+async def batch_search(
+    queries: Annotated[List[SearchQuery], Body(max_length=MAX_BATCH_QUERIES)]
+):
+    """Semantic search for several queries with a single embedding pass (422 above MAX_BATCH_QUERIES)"""
+    start_time = time.time()
+    
+    try:
+        vector_store = search_service.vector_store
+        
+        # One batched forward pass instead of one per query
+        embeddings = await asyncio.to_thread(vector_store.embed_texts, [q.query for q in queries])
+        
+        # Run the vector lookups concurrently
+        loop = asyncio.get_running_loop()
+        batch_results = await asyncio.gather(*[
+            loop.run_in_executor(None, vector_store.search_by_embedding, embedding, q.limit)
+            for embedding, q in zip(embeddings, queries)
+        ])
+        
+        processing_time = time.time() - start_time
+        
+        responses = []
+        for q, results in zip(queries, batch_results):
+            search_results = search_service.to_search_results(results)
+            responses.append(SearchResponse(
+                query=q.query,
+                results=search_results,
+                total=len(search_results),
+                processing_time=processing_time
+            ))
+        return responses
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/recommendations/{product_id}")
 async def get_recommendations(product_id: str, limit: int = 5):
     """
@@ -0,0 +1,43 @@
+"""
+Numeric kernels for turning vector distances into ranked relevance scores
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+if numba is not None:
+    @numba.njit("float32[::1](float32[::1])", fastmath=True, cache=True)
+    def scores_from_dist(dists):
+        """Map cosine distances to similarity scores in [0, 1] (1 / (1 + d))"""
+        scores = np.empty_like(dists)
+        for i in range(dists.shape[0]):
+            score = np.float32(1.0) / (np.float32(1.0) + dists[i])
+            scores[i] = min(np.float32(1.0), max(np.float32(0.0), score))
+        return scores
+
+    @numba.njit("int64[::1](float32[::1], int64)", cache=True)
+    def topk(scores, k):
+        """Indices of the k highest scores, best first"""
+        k = min(k, scores.shape[0])
+        if k == 0:
+            return np.empty(0, dtype=np.int64)
+        # Sorted so ties keep their original (distance) order
+        candidates = np.sort(np.argpartition(-scores, k - 1)[:k])
+        return candidates[np.argsort(-scores[candidates], kind="mergesort")]
+else:
+    def scores_from_dist(dists):
+        """Map cosine distances to similarity scores in [0, 1] (1 / (1 + d))"""
+        return np.clip(1.0 / (1.0 + dists), 0.0, 1.0).astype(np.float32)
+
+    def topk(scores, k):
+        """Indices of the k highest scores, best first"""
+        k = min(k, scores.shape[0])
+        if k == 0:
+            return np.empty(0, dtype=np.int64)
+        # Sorted so ties keep their original (distance) order
+        candidates = np.sort(np.argpartition(-scores, k - 1)[:k])
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
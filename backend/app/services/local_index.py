@@ -0,0 +1,173 @@
+"""
+In-process ANN index mirroring the pgvector embeddings table
+"""
+from langchain_core.documents import Document
+from typing import Dict, List, NamedTuple, Tuple, Optional
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# Below this many vectors a brute-force matmul over the whole corpus beats
+# the HNSW graph walk, and over float32 rows it is exact
+EXACT_SEARCH_MAX = 20_000
+
+# int8 codes only save memory (rows are widened back to float32 to score, so
+# there is no compute win) and are only worth their rounding error with enough
+# dimensions to average it out; rows are widened this many at a time (fits in L2)
+INT8_MIN_DIM = 64
+INT8_SCAN_ROWS = 1024
+
+
+class _Int8Corpus(NamedTuple):
+    """Rows quantized with per-row absmax scaling: row ~= codes * scale"""
+    codes: np.ndarray
+    scales: np.ndarray
+    
+    @classmethod
+    def quantize(cls, corpus: np.ndarray) -> "_Int8Corpus":
+        scales = np.abs(corpus).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        codes = np.round(corpus / scales[:, None]).astype(np.int8)
+        return cls(codes, scales.astype(np.float32))
+    
+    def __len__(self) -> int:
+        return len(self.codes)
+    
+    def __matmul__(self, query: np.ndarray) -> np.ndarray:
+        """Approximate corpus @ query (a vector or a (dim, n_queries) matrix)"""
+        scores = np.empty((len(self.codes),) + query.shape[1:], dtype=np.float32)
+        for start in range(0, len(self.codes), INT8_SCAN_ROWS):
+            chunk = self.codes[start:start + INT8_SCAN_ROWS]
+            scores[start:start + len(chunk)] = chunk.astype(np.float32) @ query
+        scores *= self.scales.reshape((-1,) + (1,) * (query.ndim - 1))
+        return scores
+
+
+class LocalANNIndex:
+    """
+    In-memory index over all product embeddings, rebuilt from Postgres
+    
+    Small corpora are scored by brute force with one matrix-vector product,
+    exactly over float32 rows, or approximately over int8 codes with
+    quantize=True to cut the corpus's memory 4x; larger ones (or
+    backend="hnsw") use an hnswlib graph when it is installed.
+    """
+    
+    def __init__(self, dim: int, m: int = 24, ef_construction: int = 128, ef_search: int = 100,
+                 backend: str = "auto", quantize: bool = False):
+        self.dim = dim
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.backend = backend
+        # Opt-in: store the brute-force corpus as int8 (4x less memory, approximate scores)
+        self.quantize = quantize and dim >= INT8_MIN_DIM
+        # (index or corpus matrix, documents, row of each document id), swapped
+        # as a whole on rebuild
+        self._state: Optional[Tuple[object, List[Document], Dict[str, int]]] = None
+    
+    @staticmethod
+    def available() -> bool:
+        """Whether a backend is usable (exact search only needs NumPy)"""
+        return True
+    
+    def _use_exact(self, count: int) -> bool:
+        if hnswlib is None or self.backend == "exact":
+            return True
+        return self.backend == "auto" and count <= EXACT_SEARCH_MAX
+    
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+    
+    def __len__(self) -> int:
+        return len(self._state[1]) if self._state else 0
+    
+    def build(self, documents: List[Document], embeddings: np.ndarray):
+        """Build a fresh index and swap it in for concurrent readers"""
+        if self._use_exact(len(documents)):
+            # Contiguous float32 so every query is a single BLAS sgemv
+            corpus = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(documents), self.dim)
+            norms = np.linalg.norm(corpus, axis=1, keepdims=True)
+            corpus /= np.where(norms == 0, 1.0, norms)
+            self._state = (_Int8Corpus.quantize(corpus) if self.quantize else corpus, documents, self._rows(documents))
+            return
+        
+        # Embeddings are unit-norm: inner product skips cosine's normalization
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        index.init_index(
+            max_elements=max(len(documents), 1),
+            M=self.m,
+            ef_construction=self.ef_construction
+        )
+        if documents:
+            index.add_items(embeddings, np.arange(len(documents)))
+        index.set_ef(self.ef_search)
+        self._state = (index, documents, self._rows(documents))
+    
+    @staticmethod
+    def _rows(documents: List[Document]) -> Dict[str, int]:
+        return {doc.id: i for i, doc in enumerate(documents)}
+    
+    def get_vector(self, doc_id: str) -> Optional[np.ndarray]:
+        """Stored (unit-norm) embedding of a document, or None if it isn't indexed"""
+        index, _, rows = self._state
+        row = rows.get(doc_id)
+        if row is None:
+            return None
+        if isinstance(index, np.ndarray):
+            return index[row]
+        if isinstance(index, _Int8Corpus):
+            return index.codes[row].astype(np.float32) * index.scales[row]
+        return np.asarray(index.get_items([row])[0], dtype=np.float32)
+    
+    def search(self, embedding: List[float], limit: int = 10) -> List[Tuple[Document, float]]:
+        """Return (document, 1 - inner product) pairs, nearest first"""
+        index, documents, _ = self._state
+        k = min(limit, len(documents))
+        if k == 0:
+            return []
+        if isinstance(index, (np.ndarray, _Int8Corpus)):
+            return self._search_exact(index, documents, embedding, k)
+        labels, distances = index.knn_query(np.asarray(embedding, dtype=np.float32), k=k)
+        return [
+            (documents[label], float(distance))
+            for label, distance in zip(labels[0], distances[0])
+        ]
+    
+    def search_batch(self, embeddings: np.ndarray, limit: int = 10) -> List[List[Tuple[Document, float]]]:
+        """search() for every row of an (n_queries, dim) array in one pass over the index"""
+        index, documents, _ = self._state
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        k = min(limit, len(documents))
+        if k == 0 or len(queries) == 0:
+            return [[] for _ in range(len(queries))]
+        if isinstance(index, (np.ndarray, _Int8Corpus)):
+            # One matrix-matrix product scores every query against the corpus
+            scores = (index @ self._normalize(queries).T).T
+            return [self._top_k(documents, row, k) for row in scores]
+        labels, distances = index.knn_query(queries, k=k)
+        return [
+            [(documents[label], float(distance)) for label, distance in zip(row_labels, row_distances)]
+            for row_labels, row_distances in zip(labels, distances)
+        ]
+    
+    @staticmethod
+    def _normalize(queries: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(queries, axis=-1, keepdims=True)
+        return queries / np.where(norms == 0, 1.0, norms)
+    
+    @classmethod
+    def _search_exact(cls, corpus, documents: List[Document], embedding: List[float], k: int) -> List[Tuple[Document, float]]:
+        query = cls._normalize(np.asarray(embedding, dtype=np.float32))
+        return cls._top_k(documents, corpus @ query, k)
+    
+    @staticmethod
+    def _top_k(documents: List[Document], scores: np.ndarray, k: int) -> List[Tuple[Document, float]]:
+        # Select the top k in O(n), then sort only those
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(documents[i], float(1.0 - scores[i])) for i in top]
@@ -0,0 +1,111 @@
+"""
+Semantic LRU cache for search results
+"""
+from collections import OrderedDict
+from typing import Any, List, Optional
+import re
+import numpy as np
+
+# Numbers usually carry a constraint ("under $100", "2 seats") that barely
+# moves the embedding, so queries containing one never match semantically
+_NUMBER = re.compile(r"\d")
+
+
+def normalize_query(query: str) -> str:
+    """Exact-match key: case and whitespace differences don't matter"""
+    return " ".join(query.lower().split())
+
+
+class SemanticQueryCache:
+    """
+    LRU cache of search results keyed by query text
+    
+    Lookups first try the normalized query text, then fall back to the
+    cached query whose embedding has the highest cosine similarity; if that
+    is at least `threshold` its results are reused. Queries with numbers
+    take no part in the similarity fallback, on either side, since
+    "chairs under $100" and "chairs under $500" embed almost identically.
+    Embeddings are expected to be L2-normalized so cosine similarity is a
+    plain dot product.
+    """
+    
+    def __init__(self, capacity: int = 10_000, threshold: float = 0.95):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.clear()
+    
+    def clear(self):
+        """Drop all cached entries"""
+        # query -> slot, in LRU order (oldest first)
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._queries: List[Optional[str]] = [None] * self.capacity
+        self._entries: List[Any] = [None] * self.capacity
+        self._embeddings: Optional[np.ndarray] = None
+        # Slots whose query contains a number; never returned by get_similar
+        self._numeric = np.zeros(self.capacity, dtype=bool)
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._high_water = 0
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def get(self, query: str, limit: int) -> Optional[list]:
+        """Return cached results for exactly this (normalized) query, if any"""
+        slot = self._slots.get(normalize_query(query))
+        if slot is None:
+            return None
+        return self._hit(slot, limit)
+    
+    def get_similar(self, query: str, embedding: List[float], limit: int) -> Optional[list]:
+        """Return cached results for the most similar cached query, if close enough"""
+        if not self._slots or _NUMBER.search(query):
+            return None
+        sims = self._embeddings[:self._high_water] @ np.asarray(embedding, dtype=np.float32)
+        sims[self._numeric[:self._high_water]] = -np.inf
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold or self._queries[best] is None:
+            return None
+        return self._hit(best, limit)
+    
+    def get_embedding(self, query: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for exactly this (normalized) query, if any"""
+        slot = self._slots.get(normalize_query(query))
+        return None if slot is None else self._embeddings[slot]
+    
+    def put(self, query: str, embedding: List[float], limit: int, results: list):
+        """Cache results computed for `query` with the given limit"""
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.capacity, len(embedding)), dtype=np.float32)
+        
+        numeric = bool(_NUMBER.search(query))
+        query = normalize_query(query)
+        slot = self._slots.get(query)
+        if slot is None:
+            if not self._free:
+                _, evicted = self._slots.popitem(last=False)
+                self._release(evicted)
+            slot = self._free.pop()
+            self._high_water = max(self._high_water, slot + 1)
+        
+        self._slots[query] = slot
+        self._slots.move_to_end(query)
+        self._queries[slot] = query
+        self._entries[slot] = (limit, results)
+        self._embeddings[slot] = embedding
+        self._numeric[slot] = numeric
+    
+    def _hit(self, slot: int, limit: int) -> Optional[list]:
+        cached_limit, results = self._entries[slot]
+        # Results fetched with a smaller limit can't answer this request
+        if cached_limit < limit:
+            return None
+        self._slots.move_to_end(self._queries[slot])
+        return results[:limit]
+    
+    def _release(self, slot: int):
+        self._queries[slot] = None
+        self._entries[slot] = None
+        # Zeroed rows can never reach the similarity threshold
+        self._embeddings[slot] = 0.0
+        self._numeric[slot] = False
+        self._free.append(slot)
@@ -1,55 +1,150 @@
-from typing import List
+from typing import List, Tuple, Any, Optional, Sequence
 from app.models import SearchResult, Product
-from app.services.vector_store import VectorStoreService
+from app.services.vector_store import get_vector_store
+from app.services.query_cache import SemanticQueryCache
+from app.services._rerank import scores_from_dist, topk
+import numpy as np
+import asyncio
 import logging
+import threading
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Metadata comes from our own table (validated on upload), so products are
+# built with model_construct and only known fields are passed through
+_PRODUCT_FIELDS = tuple(Product.model_fields)
+
+def _product_from_metadata(product_data: dict) -> Product:
+    """Build a Product from stored metadata without re-running validation"""
+    return Product.model_construct(**{k: product_data[k] for k in _PRODUCT_FIELDS if k in product_data})
+
 class SearchService:
     """Search service using pgvector for semantic search"""
     
     def __init__(self):
-        self.vector_store = VectorStoreService()
+        # Shared instance, so the embedding model is only ever loaded once
+        self.vector_store = get_vector_store()
+        # Near-duplicate queries reuse cached results instead of searching again
+        self._cache = SemanticQueryCache(capacity=10_000, threshold=0.95)
+        self._cache_version = self.vector_store.data_version
+        # Query embeddings don't depend on the product data, so unlike the
+        # result cache this one survives product changes
+        self.embed_query = lru_cache(maxsize=1024)(self._embed_query)
+    
+    def _embed_query(self, query: str) -> Tuple[float, ...]:
+        return tuple(self.vector_store.embeddings.embed_query(query))
     
-    async def search(self, query: str, limit: int = 10) -> List[SearchResult]:
+    async def embed_batch(self, queries: List[str]) -> np.ndarray:
+        """Embed several queries in one model call, as an (n_queries, dim) array"""
+        embeddings = await asyncio.to_thread(self.vector_store.embed_texts, queries)
+        return np.asarray(embeddings, dtype=np.float32).reshape(len(queries), -1)
+    
+    async def search(self, query: str, limit: int = 10, embedding: Optional[Sequence[float]] = None,
+                     use_cache: bool = True) -> List[SearchResult]:
         """
         Perform semantic search using pgvector
         
         Args:
             query: Natural language search query
             limit: Maximum number of results
+            embedding: Precomputed query embedding (e.g. from embed_batch)
+            use_cache: False to always embed and search (e.g. when timing search)
             
         Returns:
             List of SearchResult objects with products and scores
         """
         try:
-            # Perform vector similarity search
-            results = self.vector_store.search(query, limit)
+            self._check_cache_version()
             
-            # Convert to SearchResult objects
-            search_results = []
-            for doc, distance in results:
-                # pgvector returns distance (lower is better)
-                # Convert to similarity score (0-1, higher is better)
-                # Use exponential decay to ensure positive scores
-                similarity_score = max(0.0, min(1.0, 1 / (1 + distance)))
-                
-                # Extract product from metadata
-                product_data = doc.metadata
-                product = Product(**product_data)
-                
-                search_results.append(SearchResult(
-                    product=product,
-                    score=similarity_score
-                ))
+            if use_cache:
+                cached = self._cache.get(query, limit)
+                if cached is not None:
+                    return cached
+            
+            # Model inference and DB calls block, so run them off the event loop
+            if embedding is None:
+                embed = self.embed_query if use_cache else self._embed_query
+                embedding = await asyncio.to_thread(embed, query)
+            embedding = list(embedding)
+            if use_cache:
+                cached = self._cache.get_similar(query, embedding, limit)
+                if cached is not None:
+                    return cached
+            
+            # Perform vector similarity search
+            results = await asyncio.to_thread(self.vector_store.search_by_embedding, embedding, limit)
+            search_results = self.to_search_results(results)
             
             logger.info(f"Search for '{query}' returned {len(search_results)} results")
+            if use_cache:
+                self._cache.put(query, embedding, limit, search_results)
             return search_results
             
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
             return []
     
+    async def search_batch(self, queries: List[str], limit: int = 10,
+                           embeddings: Optional[np.ndarray] = None) -> List[List[SearchResult]]:
+        """
+        Search several queries with one batched embedding call and one index pass
+        
+        Args:
+            queries: Natural language search queries
+            limit: Maximum number of results per query
+            embeddings: Precomputed (n_queries, dim) query embeddings
+            
+        Returns:
+            One list of SearchResult objects per query, in query order
+        """
+        try:
+            self._check_cache_version()
+            
+            batch: List[List[SearchResult]] = [self._cache.get(query, limit) for query in queries]
+            misses = [i for i, cached in enumerate(batch) if cached is None]
+            if misses:
+                if embeddings is None:
+                    miss_embeddings = await self.embed_batch([queries[i] for i in misses])
+                else:
+                    miss_embeddings = np.asarray(embeddings, dtype=np.float32)[misses]
+                results = await asyncio.to_thread(self.vector_store.search_by_embeddings, miss_embeddings, limit)
+                for i, embedding, query_results in zip(misses, miss_embeddings, results):
+                    batch[i] = self.to_search_results(query_results)
+                    self._cache.put(queries[i], embedding, limit, batch[i])
+            
+            logger.info(f"Batch search for {len(queries)} queries ({len(misses)} uncached)")
+            return batch
+            
+        except Exception as e:
+            logger.error(f"Batch search error: {str(e)}")
+            return [[] for _ in queries]
+    
+    def _check_cache_version(self):
+        """Cached results are stale once products change"""
+        if self._cache_version != self.vector_store.data_version:
+            self._cache.clear()
+            self._cache_version = self.vector_store.data_version
+    
+    def to_search_results(self, results: List[Tuple[Any, float]]) -> List[SearchResult]:
+        """Convert (document, distance) pairs from the vector store to SearchResult objects"""
+        # pgvector returns distance (lower is better)
+        # Convert to similarity score (0-1, higher is better) in one vectorized pass
+        dists = np.fromiter((distance for _, distance in results), dtype=np.float32, count=len(results))
+        scores = scores_from_dist(dists)
+        
+        search_results = []
+        for i in topk(scores, len(results)):
+            # Extract product from metadata
+            product_data = results[i][0].metadata
+            product = _product_from_metadata(product_data)
+            
+            search_results.append(SearchResult(
+                product=product,
+                score=float(scores[i])
+            ))
+        return search_results
+    
     async def get_similar(self, product_id: str, limit: int = 5) -> List[SearchResult]:
         """
         Get similar products based on product ID
@@ -62,20 +157,17 @@ class SearchService:
             List of similar products
         """
         try:
-            # Search using product ID as query
-            # In a real system, you'd fetch the product and use its embedding
-            results = self.vector_store.search(product_id, limit + 1)
+            # Use the product's stored embedding rather than embedding its id
+            embedding = await asyncio.to_thread(self.vector_store.get_embedding_by_id, product_id)
+            if embedding is None:
+                return []
+            results = await asyncio.to_thread(self.vector_store.search_by_embedding, list(embedding), limit + 1)
             
             # Filter out the original product and convert results
-            search_results = []
-            for doc, distance in results:
-                if doc.metadata.get('id') != product_id:
-                    similarity_score = 1 / (1 + distance)
-                    product = Product(**doc.metadata)
-                    search_results.append(SearchResult(
-                        product=product,
-                        score=similarity_score
-                    ))
+            search_results = [
+                result for result in self.to_search_results(results)
+                if result.product.id != product_id
+            ]
             
             return search_results[:limit]
             
@@ -86,25 +178,17 @@ class SearchService:
     async def initialize_vector_store(self, products: List[dict]):
 
         pass
-    async def get_similar(self, product_id: str, limit: int = 5) -> List[SearchResult]:
-        """Get similar products based on product ID"""
-        try:
-            # Get the product from database
-            # For now, simulate by getting product embedding
-            results = self.vector_store.search(product_id, limit + 1)
-            
-            # Filter out the original product
-            search_results = []
-            for doc, score in results:
-                if doc.metadata.get('id') != product_id:
-                    similarity_score = 1 / (1 + score)
-                    product = Product(**doc.metadata)
-                    search_results.append(SearchResult(
-                        product=product,
-                        score=similarity_score
-                    ))
-            
-            return search_results[:limit]
-        except Exception as e:
-            logger.error(f"Recommendations error: {str(e)}")
-            return []
\ No newline at end of file
+
+
+_search_service_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _create_search_service() -> SearchService:
+    return SearchService()
+
+def get_search_service() -> SearchService:
+    """Process-wide SearchService, so test suites and routes share one model and index"""
+    # Serialize the first call: lru_cache alone can run the factory twice
+    # when two threads miss the cache at the same time
+    with _search_service_lock:
+        return _create_search_service()
@@ -1,12 +1,166 @@
 from langchain_postgres import PGVector
+from langchain_postgres.vectorstores import DistanceStrategy
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_openai import OpenAIEmbeddings
-from typing import List, Tuple, Any
+from langchain_core.documents import Document
+from sqlalchemy import create_engine, event, text
+from typing import List, Tuple, Any, Dict, Optional
+from functools import lru_cache
+from contextlib import ExitStack
+from app.services.local_index import LocalANNIndex
+from app.services.onnx_embeddings import OnnxEmbeddings
+import numpy as np
+import psycopg
+import threading
+import time
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Tables created by langchain_postgres for all collections
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+COLLECTION_NAME = "products"
+HNSW_INDEX_NAME = "idx_products_embedding_hnsw"
+BINARY_INDEX_NAME = "idx_products_embedding_bit_hnsw"
+CATEGORY_INDEX_NAME = "idx_products_category"
+
+# Two-stage search: Hamming-distance candidates from the bit index,
+# reranked by full inner-product distance
+RERANK_CANDIDATES = 200
+RERANK_EF_SEARCH = 1000
+
+# Texts per forward pass of the local embedding model
+EMBED_BATCH_SIZE = 64
+
+# NOTIFY channel used to tell every process to rebuild its in-process index
+CHANGE_CHANNEL = "products_changed"
+# Notifications arriving this long after the first are folded into one rebuild
+NOTIFY_COALESCE_SECONDS = 0.5
+
+
+def configured_embedding_dim() -> int:
+    """Dimension of the configured embedding model (MiniLM locally, OpenAI otherwise)"""
+    return 384 if os.getenv("USE_LOCAL_EMBEDDINGS", "true").lower() == "true" else 1536
+
+
+def hnsw_params(vector_count: int) -> Tuple[int, int, int]:
+    """Pick (m, ef_construction, ef_search) for a collection of the given size"""
+    if vector_count < 100_000:
+        return 16, 64, 40
+    if vector_count < 1_000_000:
+        return 24, 100, 100
+    return 32, 128, 200
+
+
+def get_embedding_column_type(conn) -> str:
+    """Return the SQL type of the embedding column, e.g. 'halfvec(384)'"""
+    return conn.execute(text(
+        f"SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+        f"WHERE attrelid = '{EMBEDDING_TABLE}'::regclass AND attname = 'embedding'"
+    )).scalar()
+
+
+def migrate_to_halfvec(conn, dim: Optional[int] = None):
+    """
+    Store embeddings as halfvec (float16)
+    
+    Halves the bytes read per vector during HNSW traversal with negligible
+    recall loss for normalized embeddings. The dimension defaults to the
+    one declared on the current column.
+    """
+    column_type = get_embedding_column_type(conn)
+    if column_type.startswith("halfvec"):
+        return
+    if dim is None:
+        if "(" not in column_type:
+            raise ValueError("Embedding column has no dimension; pass dim explicitly")
+        dim = int(column_type.split("(")[1].rstrip(")"))
+    # The existing indexes use vector operators and can't survive the type change
+    drop_hnsw_indexes(conn)
+    conn.execute(text(
+        f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding "
+        f"TYPE halfvec({dim}) USING embedding::halfvec({dim})"
+    ))
+
+
+def create_hnsw_index(conn, m: int, ef_construction: int):
+    """
+    Create the HNSW indexes used for similarity search (no-op if they exist)
+    
+    Builds an inner-product index on the embeddings and a Hamming index on their
+    binary quantization for the first stage of two-stage search.
+    """
+    # Operator class has to match the column type (vector or halfvec)
+    column_type = get_embedding_column_type(conn)
+    if "(" not in column_type:
+        raise ValueError("Embedding column has no dimension; run migrate_to_halfvec with dim first")
+    vector_type, dim = column_type.split("(")[0], column_type.split("(")[1].rstrip(")")
+    # Index builds are much faster when the graph fits in maintenance memory.
+    # LOCAL so the settings end with the transaction instead of staying on a
+    # pooled connection
+    conn.execute(text("SET LOCAL maintenance_work_mem = '2GB'"))
+    conn.execute(text("SET LOCAL max_parallel_maintenance_workers = 7"))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {HNSW_INDEX_NAME} ON {EMBEDDING_TABLE} "
+        f"USING hnsw (embedding {vector_type}_ip_ops) "
+        f"WITH (m = {m}, ef_construction = {ef_construction})"
+    ))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {BINARY_INDEX_NAME} ON {EMBEDDING_TABLE} "
+        f"USING hnsw ((binary_quantize(embedding)::bit({dim})) bit_hamming_ops) "
+        f"WITH (m = {m}, ef_construction = {ef_construction})"
+    ))
+
+
+def create_metadata_indexes(conn):
+    """Create the BTREE index used to pre-filter filtered searches by category"""
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {CATEGORY_INDEX_NAME} ON {EMBEDDING_TABLE} "
+        f"(lower(cmetadata->>'category'))"
+    ))
+
+
+def drop_hnsw_indexes(conn):
+    """Drop both HNSW indexes"""
+    for index_name in (HNSW_INDEX_NAME, BINARY_INDEX_NAME):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+
+def hnsw_index_uses_ip(conn) -> bool:
+    """Whether the existing HNSW index was built with inner-product operators"""
+    definition = conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"),
+        {"name": HNSW_INDEX_NAME}
+    ).scalar()
+    return definition is not None and "_ip_ops" in definition
+
+
+def get_hnsw_index_options(conn) -> Dict[str, int]:
+    """Return the build options of the existing HNSW index (empty if missing)"""
+    options = conn.execute(
+        text("SELECT reloptions FROM pg_class WHERE relname = :name"),
+        {"name": HNSW_INDEX_NAME}
+    ).scalar()
+    return {
+        key: int(value)
+        for key, value in (option.split("=", 1) for option in options or [])
+    }
+
+def _vector_literal(embedding: List[float]) -> str:
+    """Format an embedding as a pgvector text literal"""
+    return "[" + ",".join(map(str, embedding)) + "]"
+
+def _make_text(product: dict) -> str:
+    """Build the searchable text for a product from its important fields"""
+    return " ".join((
+        product['name'],
+        product['description'],
+        'Category:', product['category'],
+        'Brand:', product['brand']
+    ))
+
 class VectorStoreService:
     """Service for vector similarity search using pgvector"""
     
@@ -17,86 +171,361 @@ class VectorStoreService:
         # Initialize embedding model
         use_local = os.getenv("USE_LOCAL_EMBEDDINGS", "true").lower() == "true"
         
-        if use_local:
+        onnx_model_dir = os.getenv(
+            "ONNX_MODEL_DIR",
+            os.path.join(os.path.dirname(__file__), "../../models/minilm-onnx")
+        )
+        
+        if use_local and OnnxEmbeddings.available(onnx_model_dir):
+            # int8 export from scripts/export_onnx_model.py, same vectors as MiniLM
+            print("📦 Loading local embedding model (ONNX Runtime, int8)...")
+            self.embeddings = OnnxEmbeddings(onnx_model_dir, batch_size=EMBED_BATCH_SIZE)
+            print("✅ Local embeddings loaded (dimension: 384)")
+        elif use_local:
             print("📦 Loading local embedding model (sentence-transformers)...")
             self.embeddings = HuggingFaceEmbeddings(
                 model_name="sentence-transformers/all-MiniLM-L6-v2",
                 model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
+                encode_kwargs={'normalize_embeddings': True, 'batch_size': EMBED_BATCH_SIZE}
             )
             print("✅ Local embeddings loaded (dimension: 384)")
         else:
             print("🔑 Using OpenAI embeddings...")
             self.embeddings = OpenAIEmbeddings()
             print("✅ OpenAI embeddings configured (dimension: 1536)")
+        self.embedding_dim = configured_embedding_dim()
+        self.ef_search = hnsw_params(0)[2]
+        # Bumped whenever the stored products change, so callers can drop caches
+        self.data_version = 0
+        # Per-instance cache of embeddings read from Postgres, cleared on every write
+        self._sql_embedding_by_id = lru_cache(maxsize=10_000)(self._get_embedding_by_id)
+        
+        # Shared engine so every pooled connection gets the HNSW search settings;
+        # the pool is sized for concurrent searches and drops dead connections
+        self.engine = create_engine(
+            self.connection,
+            pool_size=20,
+            max_overflow=40,
+            pool_pre_ping=True
+        )
+        event.listen(self.engine, "connect", self._configure_connection)
         
         # Initialize PGVector store
+        # A fixed embedding length is required for the column to be indexable
         self.vectorstore = PGVector(
-            connection=self.connection,
+            connection=self.engine,
             embeddings=self.embeddings,
-            collection_name="products",
+            collection_name=COLLECTION_NAME,
+            embedding_length=self.embedding_dim,
             use_jsonb=True,
+            # Embeddings are unit-norm, so inner product ranks like cosine
+            # without the per-comparison norm computation
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
             pre_delete_collection=False
         )
-        print("✅ Vector store initialized")
+        self._configure_hnsw()
+        print(f"✅ Vector store initialized (hnsw.ef_search={self.ef_search})")
+        
+        # Serve reads from an in-process index; Postgres stays the write path
+        self.local_index = None
+        use_local_index = os.getenv("USE_LOCAL_INDEX", "true").lower() == "true"
+        if use_local_index and LocalANNIndex.available():
+            self.local_index = LocalANNIndex(
+                self.embedding_dim,
+                backend=os.getenv("LOCAL_INDEX_BACKEND", "auto").lower(),
+                quantize=os.getenv("LOCAL_INDEX_INT8", "false").lower() == "true"
+            )
+            self.refresh_local_index()
+            print(f"✅ In-process index loaded ({len(self.local_index)} vectors)")
+        # Product writes and schema changes (init_db's halfvec migration) are announced by NOTIFY
+        threading.Thread(
+            target=self._listen_for_changes, name="change-listener", daemon=True
+        ).start()
+    
+    def _configure_connection(self, dbapi_connection, connection_record):
+        """Apply HNSW query settings to each new database connection"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET hnsw.ef_search = {int(self.ef_search)}")
+        cursor.close()
+        # Commit so the pool's reset-on-return rollback doesn't undo the SET
+        dbapi_connection.commit()
+    
+    def _configure_hnsw(self):
+        """
+        Scale ef_search with the collection size for all pooled connections
+        
+        Only reads the schema; building or rebuilding the indexes is left to
+        scripts/init_db.py so service startup never runs DDL.
+        """
+        with self.engine.begin() as conn:
+            self.vector_type = get_embedding_column_type(conn)
+            vector_count = conn.execute(text(
+                f"SELECT count(*) FROM {EMBEDDING_TABLE} e "
+                f"JOIN {COLLECTION_TABLE} c ON e.collection_id = c.uuid "
+                f"WHERE c.name = :name"
+            ), {"name": COLLECTION_NAME}).scalar()
+            _, _, ef_search = hnsw_params(vector_count)
+        
+        if ef_search != self.ef_search:
+            self.ef_search = ef_search
+            # Drop pooled connections so new ones pick up the new ef_search
+            self.engine.dispose()
+    
+    def warm_pool(self, connections: int = 20):
+        """Open pooled connections ahead of a burst of SQL searches so it doesn't pay for connecting"""
+        if self.local_index is not None:
+            # Searches are answered in-process; there are no connections to warm
+            return
+        with ExitStack() as stack:
+            # Held together so the pool has to open each one; closing returns them
+            for _ in range(min(connections, self.engine.pool.size())):
+                stack.enter_context(self.engine.connect())
+    
+    def refresh_local_index(self):
+        """Reload all embeddings from Postgres into the in-process index"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                f"SELECT id, document, cmetadata, embedding::text AS embedding "
+                f"FROM {EMBEDDING_TABLE} "
+                f"WHERE collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection)"
+            ), {"collection": COLLECTION_NAME}).fetchall()
+        documents = [
+            Document(id=row.id, page_content=row.document, metadata=row.cmetadata)
+            for row in rows
+        ]
+        embeddings = np.array(
+            [row.embedding[1:-1].split(",") for row in rows], dtype=np.float32
+        ).reshape(len(rows), self.embedding_dim)
+        self.local_index.build(documents, embeddings)
+        self.data_version += 1
+        self._sql_embedding_by_id.cache_clear()
+    
+    def _apply_change(self):
+        """Pick up a change announced on CHANGE_CHANNEL"""
+        # The column type may have changed (vector -> halfvec); queries must cast to it
+        self._configure_hnsw()
+        if self.local_index is not None:
+            self.refresh_local_index()
+        else:
+            self.data_version += 1
+            self._sql_embedding_by_id.cache_clear()
+    
+    def _listen_for_changes(self):
+        """Re-read the schema and drop stale data whenever any process writes products"""
+        conninfo = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANGE_CHANNEL}")
+                    while True:
+                        # Block until a write, then drain the ones right behind it
+                        # so a burst of writes costs a single reload
+                        for _ in conn.notifies(stop_after=1):
+                            pass
+                        for _ in conn.notifies(timeout=NOTIFY_COALESCE_SECONDS):
+                            pass
+                        self._apply_change()
+            except Exception as e:
+                print(f"⚠️  Change listener error: {e}")
+                time.sleep(5)
+    
+    def notify_change(self):
+        """Tell all processes that the embeddings table changed"""
+        with self.engine.begin() as conn:
+            conn.execute(text(f"NOTIFY {CHANGE_CHANNEL}"))
+        # This process's own listener receives it too and applies the change once
     
     def add_product(self, product: dict):
         """Add a single product to the vector store"""
-        # Create searchable text combining important fields
-        text = (
-            f"{product['name']} "
-            f"{product['description']} "
-            f"Category: {product['category']} "
-            f"Brand: {product['brand']}"
-        )
-        
         # Add to vector store with metadata
         self.vectorstore.add_texts(
-            texts=[text],
+            texts=[_make_text(product)],
             metadatas=[product],
             ids=[product['id']]
         )
+        self.notify_change()
     
-    def add_products_bulk(self, products: List[dict]):
-        """Add multiple products efficiently"""
-        texts = []
-        metadatas = []
-        ids = []
-        
-        for product in products:
-            text = (
-                f"{product['name']} "
-                f"{product['description']} "
-                f"Category: {product['category']} "
-                f"Brand: {product['brand']}"
-            )
-            texts.append(text)
-            metadatas.append(product)
-            ids.append(product['id'])
+    def add_products_bulk(self, products: List[dict], notify: bool = True):
+        """
+        Add multiple products efficiently
+        
+        Pass notify=False when adding many batches and call notify_change()
+        once at the end, so listening processes reload the table only once.
+        """
+        texts = list(map(_make_text, products))
+        
+        # Longest first, so each embedding batch holds texts of similar
+        # length and little time is spent on padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
         
         self.vectorstore.add_texts(
-            texts=texts,
-            metadatas=metadatas,
-            ids=ids
+            texts=[texts[i] for i in order],
+            metadatas=[products[i] for i in order],
+            ids=[products[i]['id'] for i in order]
         )
+        if notify:
+            self.notify_change()
     
     def search(self, query: str, limit: int = 10) -> List[Tuple[Any, float]]:
         """Search for products similar to query"""
-        results = self.vectorstore.similarity_search_with_score(
-            query=query,
-            k=limit
-        )
-        return results
+        embedding = self.embeddings.embed_query(query)
+        return self.search_by_embedding(embedding, limit)
+    
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one batched model call"""
+        return self.embeddings.embed_documents(texts)
+    
+    def get_embedding_by_id(self, product_id: str) -> Optional[Tuple[float, ...]]:
+        """Stored embedding of a product (None if it is not in the store)"""
+        if self.local_index is not None and self.local_index.ready:
+            # Every stored vector is already in memory
+            vector = self.local_index.get_vector(product_id)
+            return tuple(vector.tolist()) if vector is not None else None
+        return self._sql_embedding_by_id(product_id)
+    
+    def _get_embedding_by_id(self, product_id: str) -> Optional[Tuple[float, ...]]:
+        """Embedding of a product read from Postgres"""
+        # Products are stored with their product id as the row id
+        with self.engine.connect() as conn:
+            embedding = conn.execute(text(
+                f"SELECT embedding::text FROM {EMBEDDING_TABLE} "
+                f"WHERE id = :id "
+                f"AND collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection) "
+                f"LIMIT 1"
+            ), {"id": product_id, "collection": COLLECTION_NAME}).scalar()
+        if embedding is None:
+            return None
+        return tuple(float(x) for x in embedding[1:-1].split(","))
     
     def search_by_embedding(self, embedding: List[float], limit: int = 10) -> List[Tuple[Any, float]]:
-        """Search using a pre-computed embedding"""
-        results = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
-            embedding=embedding,
-            k=limit
+        """
+        Search using a pre-computed embedding
+        
+        Uses the in-process index when loaded. Otherwise runs a two-stage
+        search in Postgres: the binary-quantized index returns the nearest
+        candidates by Hamming distance, which are then reranked by exact
+        inner product. Distances are reported as 1 - a·b, which equals cosine
+        distance for the unit-norm embeddings we store.
+        """
+        if self.local_index is not None and self.local_index.ready:
+            return self.local_index.search(embedding, limit)
+        
+        # Casts must match the index expressions exactly for the indexes to be used
+        query_vector = f"CAST(:embedding AS {self.vector_type})"
+        stmt = text(
+            f"WITH candidates AS ("
+            f"SELECT id, document, cmetadata, embedding FROM {EMBEDDING_TABLE} "
+            f"WHERE collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection) "
+            f"ORDER BY binary_quantize(embedding)::bit({self.embedding_dim}) "
+            f"<~> binary_quantize({query_vector})::bit({self.embedding_dim}) "
+            f"LIMIT :candidates) "
+            f"SELECT id, document, cmetadata, 1 + (embedding <#> {query_vector}) AS distance "
+            f"FROM candidates ORDER BY embedding <#> {query_vector} LIMIT :limit"
+        )
+        params = {
+            "embedding": _vector_literal(embedding),
+            "collection": COLLECTION_NAME,
+            "candidates": max(RERANK_CANDIDATES, limit),
+            "limit": limit
+        }
+        with self.engine.begin() as conn:
+            # The first stage needs a wider beam than the per-connection default
+            conn.execute(
+                text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+                {"ef_search": str(max(RERANK_EF_SEARCH, params["candidates"]))}
+            )
+            rows = conn.execute(stmt, params).fetchall()
+        return [
+            (Document(id=row.id, page_content=row.document, metadata=row.cmetadata), row.distance)
+            for row in rows
+        ]
+    
+    def search_by_embeddings(self, embeddings: np.ndarray, limit: int = 10) -> List[List[Tuple[Any, float]]]:
+        """search_by_embedding for each row of an (n_queries, dim) array"""
+        if self.local_index is not None and self.local_index.ready:
+            return self.local_index.search_batch(embeddings, limit)
+        return [self.search_by_embedding(list(embedding), limit) for embedding in embeddings]
+    
+    def search_filtered(
+        self,
+        query: str,
+        k: int = 10,
+        *,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None
+    ) -> List[Tuple[Any, float]]:
+        """
+        Search with metadata filters applied inside Postgres
+        
+        The predicates run in the same query as the HNSW scan instead of
+        over-fetching and filtering in Python. HNSW applies them after the
+        index scan, so iterative scanning (pgvector >= 0.8) keeps walking the
+        graph until k rows match; only filters so selective that
+        hnsw.max_scan_tuples is exhausted first return fewer than k.
+        """
+        embedding = self.embeddings.embed_query(query)
+        query_vector = f"CAST(:embedding AS {self.vector_type})"
+        
+        conditions = [f"collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection)"]
+        params = {
+            "embedding": _vector_literal(embedding),
+            "collection": COLLECTION_NAME,
+            "k": k
+        }
+        if category:
+            conditions.append("lower(cmetadata->>'category') = :category")
+            params["category"] = category.lower()
+        if min_price:
+            conditions.append("(cmetadata->>'price')::float >= :min_price")
+            params["min_price"] = min_price
+        if max_price:
+            conditions.append("(cmetadata->>'price')::float <= :max_price")
+            params["max_price"] = max_price
+        if min_rating:
+            conditions.append("(cmetadata->>'rating')::float >= :min_rating")
+            params["min_rating"] = min_rating
+        
+        stmt = text(
+            f"SELECT id, document, cmetadata, 1 + (embedding <#> {query_vector}) AS distance "
+            f"FROM {EMBEDDING_TABLE} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY embedding <#> {query_vector} LIMIT :k"
         )
-        return results
+        with self.engine.begin() as conn:
+            # Filters discard part of the HNSW beam, so search a wider one and
+            # keep scanning while too few rows match (transaction-local)
+            conn.execute(
+                text(
+                    "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+                    "set_config('hnsw.iterative_scan', 'strict_order', true)"
+                ),
+                {"ef_search": str(max(RERANK_EF_SEARCH, k))}
+            )
+            rows = conn.execute(stmt, params).fetchall()
+        return [
+            (Document(id=row.id, page_content=row.document, metadata=row.cmetadata), row.distance)
+            for row in rows
+        ]
+    
+    def index_fingerprint(self) -> str:
+        """Row count and digest of the stored products; changes whenever they do"""
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                f"SELECT count(*) AS n, "
+                f"md5(string_agg(id || ':' || md5(document || cmetadata::text), ',' ORDER BY id)) AS digest "
+                f"FROM {EMBEDDING_TABLE} "
+                f"WHERE collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection)"
+            ), {"collection": COLLECTION_NAME}).one()
+        return f"{row.n}-{row.digest or 'empty'}"
     
     def get_product_count(self) -> int:
         """Get total number of products in vector store"""
         # This is a simple check - in production you'd query the actual table
-        return 0  # Will be updated after upload
\ No newline at end of file
+        return 0  # Will be updated after upload
+
+
+@lru_cache(maxsize=1)
+def get_vector_store() -> VectorStoreService:
+    """Process-wide VectorStoreService (one embedding model and index per process)"""
+    return VectorStoreService()
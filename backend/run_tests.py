@@ -36,15 +36,17 @@ def main():
                        help="Run advanced tests with detailed metrics")
     parser.add_argument("--benchmark", "-b", action="store_true", 
                        help="Run continuous benchmarking")
+    parser.add_argument("--cache", action="store_true", 
+                       help="Reuse results of unchanged test cases from earlier runs (timing gates still use fresh runs)")
     
     args = parser.parse_args()
     
     try:
         # Import the test runner
-        from tests.test_runner import TestRunner
+        from tests.test_runner import TestRunner, install_fast_event_loop
         
         # Create and run the test runner
-        runner = TestRunner(environment=args.environment, advanced=args.advanced)
+        runner = TestRunner(environment=args.environment, advanced=args.advanced, use_cache=args.cache)
         
         print(f"SmartSearch-AI Testing Suite v2.0")
         print(f"Environment: {args.environment.upper()}")
@@ -74,10 +76,13 @@ def main():
                 import traceback
                 traceback.print_exc()
                 return 1
+            finally:
+                runner.close()
             
             return 0
         
         # Run the async function
+        install_fast_event_loop()
         exit_code = asyncio.run(run_tests())
         sys.exit(exit_code)
         
@@ -0,0 +1,55 @@
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import torch
+from transformers import AutoModel, AutoTokenizer
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+from app.services.onnx_embeddings import ONNX_MODEL_FILE
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+def export_onnx_model():
+    """Export MiniLM to ONNX and quantize its weights to int8"""
+
+    output_dir = Path(os.getenv("ONNX_MODEL_DIR", Path(__file__).parent.parent / 'models' / 'minilm-onnx'))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"📦 Loading {MODEL_NAME}...")
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME)
+    model.eval()
+
+    # Writes tokenizer.json for the runtime tokenizer
+    tokenizer.save_pretrained(output_dir)
+
+    print("🔧 Exporting to ONNX...")
+    fp32_path = output_dir / 'model.onnx'
+    sample = tokenizer(["example product search"], return_tensors="pt")
+    dynamic_axes = {"input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "token_type_ids": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"}}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17
+        )
+
+    print("🔧 Quantizing weights to int8...")
+    quantize_dynamic(str(fp32_path), str(output_dir / ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+
+    print(f"✅ Quantized model written to {output_dir}")
+    print(f"Set ONNX_MODEL_DIR={output_dir} to use it for embeddings")
+
+if __name__ == "__main__":
+    export_onnx_model()
@@ -6,15 +6,15 @@ from sqlalchemy import create_engine, text
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-load_dotenv()
+from app.services.vector_store import (
+    CHANGE_CHANNEL, EMBEDDING_TABLE, configured_embedding_dim, create_hnsw_index, create_metadata_indexes,
+    drop_hnsw_indexes, get_hnsw_index_options, hnsw_index_uses_ip, hnsw_params, migrate_to_halfvec
+)
 
-# Debug: Print the DATABASE_URL (hide password)
-db_url = os.getenv("DATABASE_URL")
-print(f"DATABASE_URL: {db_url[:30]}...{db_url[-20:]}")  # Print partial URL
-print(f"Full URL for debugging: {db_url}")  # Remove this after fixing
+load_dotenv()
 
 def initialize_database():
-    """Initialize database with pgvector extension"""
+    """Initialize database with pgvector extension and HNSW index"""
     engine = create_engine(os.getenv("DATABASE_URL"))
     
     with engine.connect() as conn:
@@ -29,6 +29,31 @@ def initialize_database():
             print("✅ pgvector verified successfully")
         else:
             print("❌ pgvector extension not found")
+        
+        # The embeddings table is created by PGVector on first upload
+        table = conn.execute(text(f"SELECT to_regclass('{EMBEDDING_TABLE}');")).scalar()
+        if table:
+            vector_count = conn.execute(text(f"SELECT count(*) FROM {EMBEDDING_TABLE};")).scalar()
+            m, ef_construction, _ = hnsw_params(vector_count)
+            # Convert to halfvec first so the index is built with halfvec operators;
+            # tables created by PGVector before embedding_length was set have no
+            # dimension on the column, so pass the model's
+            migrate_to_halfvec(conn, configured_embedding_dim())
+            # Rebuild when the collection has crossed a size threshold or the
+            # index predates inner-product operators
+            current = get_hnsw_index_options(conn)
+            wanted = {"m": m, "ef_construction": ef_construction}
+            if current and (current != wanted or not hnsw_index_uses_ip(conn)):
+                print(f"🔧 Rebuilding HNSW index for {vector_count} vectors (m={m}, ef_construction={ef_construction})")
+                drop_hnsw_indexes(conn)
+            create_hnsw_index(conn, m, ef_construction)
+            create_metadata_indexes(conn)
+            # Running services re-read the column type (delivered on commit)
+            conn.execute(text(f"NOTIFY {CHANGE_CHANNEL}"))
+            conn.commit()
+            print("✅ HNSW index ready (halfvec)")
+        else:
+            print("ℹ️  Embeddings table not found - HNSW index will be created by upload_products.py")
 
 if __name__ == "__main__":
     initialize_database()
\ No newline at end of file
@@ -1,14 +1,21 @@
+import asyncio
 import json
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.services.vector_store import VectorStoreService
+from init_db import initialize_database
 
-def upload_products():
+# MiniLM's sweet spot per forward pass
+BATCH_SIZE = 64
+MAX_WORKERS = 8
+
+async def upload_products():
     """Upload all products to pgvector"""
     
     # Load products from JSON
@@ -21,22 +28,38 @@ def upload_products():
     
     print(f"Found {len(products)} products")
     
-    # Initialize vector store
+    # Initialize vector store (the upload never searches, so skip the in-process index)
     print("🔧 Initializing vector store...")
+    os.environ.setdefault("USE_LOCAL_INDEX", "false")
     vector_store = VectorStoreService()
     
     # Upload products (bulk is faster)
     print(f"⬆Uploading {len(products)} products to pgvector...")
     
-    # Upload in batches for progress tracking
-    batch_size = 10
-    for i in range(0, len(products), batch_size):
-        batch = products[i:i+batch_size]
-        vector_store.add_products_bulk(batch)
-        print(f"   Uploaded {min(i+batch_size, len(products))}/{len(products)}")
+    # Longest descriptions first so each batch needs little padding
+    products.sort(key=lambda p: len(p['description']), reverse=True)
+    batches = [products[i:i+BATCH_SIZE] for i in range(0, len(products), BATCH_SIZE)]
+    
+    # Embed and insert batches in parallel
+    loop = asyncio.get_running_loop()
+    uploaded = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = [
+            loop.run_in_executor(pool, vector_store.add_products_bulk, batch, False)
+            for batch in batches
+        ]
+        for batch, future in zip(batches, futures):
+            await future
+            uploaded += len(batch)
+            print(f"   Uploaded {uploaded}/{len(products)}")
+    
+    # Build the ANN index once the data is in place (init_db.py owns all index DDL);
+    # it also sends the one change notification for the whole upload
+    print("🔧 Creating HNSW index...")
+    initialize_database()
     
     print("All products uploaded successfully!")
     print(f"You can now search through {len(products)} products")
 
 if __name__ == "__main__":
-    upload_products()
\ No newline at end of file
+    asyncio.run(upload_products())
\ No newline at end of file
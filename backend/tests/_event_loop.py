@@ -0,0 +1,19 @@
+"""
+uvloop (winloop on Windows) event loop policy, shared by conftest.py and the test runner
+"""
+import sys
+
+try:
+    if sys.platform == "win32":
+        import winloop as fast_loop
+    else:
+        import uvloop as fast_loop
+except ImportError:
+    fast_loop = None
+
+
+def fast_event_loop_policy():
+    """uvloop's event loop policy (winloop's on Windows), or None when it isn't installed"""
+    if fast_loop is None:
+        return None
+    return fast_loop.EventLoopPolicy()
@@ -0,0 +1,139 @@
+"""
+Disk-backed semantic cache of search results for repeated test runs
+
+Opt-in with SMART_SEARCH_SEMCACHE=1. A query whose embedding is within cosine
+0.95 of a cached query reuses that query's results; queries with numbers only
+reuse results of the same query text, as in app/services/query_cache.py.
+Entries live under tests/.semcache/<key>/, keyed by the embedding model, the
+stored products and the backend and test code, so any of them changing starts
+a fresh cache. Empty results (which is what a failed search returns) are never
+stored. New entries are written once, at exit.
+"""
+from pathlib import Path
+from typing import Any, List, Optional
+import atexit
+import hashlib
+import os
+import pickle
+import sys
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.query_cache import _NUMBER, normalize_query
+
+CACHE_ROOT = Path(__file__).parent / ".semcache"
+SIMILARITY_THRESHOLD = 0.95
+
+CODE_GLOBS = ("app/**/*.py", "tests/*.py")
+
+
+def semcache_enabled() -> bool:
+    return os.getenv("SMART_SEARCH_SEMCACHE", "").lower() in ("1", "true", "yes")
+
+
+def code_fingerprint() -> str:
+    """Changes whenever any search or evaluation source file changes"""
+    digest = hashlib.blake2b(digest_size=16)
+    for pattern in CODE_GLOBS:
+        for path in sorted(BACKEND_DIR.glob(pattern)):
+            digest.update(path.relative_to(BACKEND_DIR).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def model_key(embeddings: Any) -> str:
+    """Short hash identifying the embedding model"""
+    name = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None) or ""
+    identity = f"{type(embeddings).__module__}.{type(embeddings).__name__}:{name}"
+    return hashlib.blake2b(identity.encode(), digest_size=8).hexdigest()
+
+
+def index_key(vector_store: Any) -> str:
+    """Embedding model plus a digest of the products stored in the database"""
+    return f"{model_key(vector_store.embeddings)}-{vector_store.index_fingerprint()}"
+
+
+def semcache_key(vector_store: Any) -> str:
+    """index_key plus the code that produced the results"""
+    identity = f"{index_key(vector_store)}|{code_fingerprint()}"
+    return hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+
+class SemanticDiskCache:
+    """Query embeddings in embeddings.npy, (normalized query, limit, results) entries in results.pkl"""
+
+    def __init__(self, key: str, threshold: float = SIMILARITY_THRESHOLD):
+        self.directory = CACHE_ROOT / key
+        self.threshold = threshold
+        self._embeddings_path = self.directory / "embeddings.npy"
+        self._results_path = self.directory / "results.pkl"
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[tuple] = []
+        self._numeric = np.zeros(0, dtype=bool)
+        self._dirty = False
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        try:
+            embeddings = np.load(self._embeddings_path)
+            with open(self._results_path, "rb") as f:
+                entries = pickle.load(f)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return
+        # Both files are rewritten together; ignore a half-written pair
+        if len(entries) == len(embeddings):
+            self._embeddings, self._entries = embeddings, entries
+            self._numeric = np.array([bool(_NUMBER.search(query)) for query, _, _ in entries], dtype=bool)
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, query: str, embedding: List[float], limit: int) -> Optional[list]:
+        """Cached results of the most similar query, if it is similar enough and fetched enough"""
+        if self._embeddings is None:
+            return None
+        key = normalize_query(query)
+        if _NUMBER.search(key):
+            # A number is a constraint the embedding barely sees: same text only
+            matches = [i for i, (cached, _, _) in enumerate(self._entries) if cached == key]
+            if not matches:
+                return None
+            best = matches[-1]
+        else:
+            similarities = self._embeddings @ self._unit(embedding)
+            similarities[self._numeric] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+        _, cached_limit, results = self._entries[best]
+        if cached_limit < limit:
+            return None
+        return results[:limit]
+
+    def put(self, query: str, embedding: List[float], limit: int, results: list):
+        # Search returns [] when it fails; don't pin an outage into later runs
+        if not results:
+            return
+        key = normalize_query(query)
+        vector = self._unit(embedding)[None, :]
+        self._embeddings = vector if self._embeddings is None else np.vstack([self._embeddings, vector])
+        self._entries.append((key, limit, results))
+        self._numeric = np.append(self._numeric, bool(_NUMBER.search(key)))
+        self._dirty = True
+
+    def flush(self):
+        """Write the cache to disk if entries were added since the last flush"""
+        if not self._dirty:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        np.save(self._embeddings_path, self._embeddings)
+        with open(self._results_path, "wb") as f:
+            pickle.dump(self._entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._dirty = False
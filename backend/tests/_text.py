@@ -0,0 +1,33 @@
+"""
+Lowercased product text and substring patterns shared by the evaluators
+"""
+import re
+from typing import List, NamedTuple
+
+
+def substring_pattern(words: List[str]) -> re.Pattern:
+    """Compile words into one alternation that matches like `word in text`"""
+    return re.compile("|".join(map(re.escape, words)))
+
+
+class LowerText(NamedTuple):
+    """Lowercased product fields, computed once per result and shared by all metrics"""
+    name: str
+    description: str
+    category: str
+    brand: str
+    name_description: str
+    text: str  # name, description and category
+
+    @classmethod
+    def of(cls, product) -> "LowerText":
+        name = product.name.lower()
+        description = product.description.lower()
+        category = product.category.lower()
+        name_description = f"{name} {description}"
+        return cls(name, description, category, product.brand.lower(),
+                   name_description, f"{name_description} {category}")
+
+
+def lower_results(results) -> List[LowerText]:
+    return [LowerText.of(r.product) for r in results]
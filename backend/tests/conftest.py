@@ -0,0 +1,14 @@
+"""
+Shared pytest configuration for the SmartSearch-AI test suites
+"""
+import asyncio
+
+import pytest
+
+from _event_loop import fast_event_loop_policy
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run async tests on uvloop (winloop on Windows) when it is installed"""
+    return fast_event_loop_policy() or asyncio.DefaultEventLoopPolicy()
@@ -1,8 +1,7 @@
 import pytest
 import asyncio
 import time
-import statistics
-from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import psutil
 import os
 import sys
@@ -15,17 +14,43 @@ if str(backend_dir) not in sys.path:
     sys.path.insert(0, str(backend_dir))
 
 try:
-    from app.services.search_service import SearchService
+    from app.services.search_service import get_search_service
 except ImportError as e:
     print(f"Error importing backend modules: {e}")
     print("Make sure you're running from the backend directory and the backend is properly set up")
     raise
 
+# Event-loop lag probe: a search that blocks the loop delays the probe's wake-up
+LAG_PROBE_INTERVAL = 0.05
+MAX_EVENT_LOOP_LAG = 0.1
+
+async def _lag_probe(samples):
+    """Record how late the event loop wakes up from each sleep"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        samples.append(time.perf_counter() - start - LAG_PROBE_INTERVAL)
+
+def _check_lag(samples):
+    max_lag = max(samples, default=0.0)
+    print(f"Max event-loop lag: {max_lag * 1000:.1f}ms")
+    assert max_lag < MAX_EVENT_LOOP_LAG, f"Event loop blocked for {max_lag:.3f}s - search() is running blocking work on the loop"
+
 class PerformanceTestSuite:
-    """Performance testing for semantic search"""
+    """
+    Performance testing for semantic search
+    
+    Searches bypass the service's query caches: the accuracy tests (and, in
+    --serve mode, earlier runs) already searched these queries, so cached
+    answers would time a dict lookup instead of search.
+    """
     
     def __init__(self):
-        self.search_service = SearchService()
+        self.search_service = get_search_service()
+    
+    async def warm_up(self, connections: int = 20):
+        """Open the DB connections the load tests need before anything is timed (SQL search path only)"""
+        await asyncio.to_thread(self.search_service.vector_store.warm_pool, connections)
     
     async def test_response_time(self):
         """Test search response time under normal load"""
@@ -37,15 +62,16 @@ class PerformanceTestSuite:
             "running shoes"
         ]
         
+        # One at a time: contention is test_concurrent_load's job
         times = []
         for query in queries:
-            start = time.time()
-            await self.search_service.search(query, 10)
-            end = time.time()
-            times.append(end - start)
+            start = time.perf_counter()
+            await self.search_service.search(query, 10, use_cache=False)
+            times.append(time.perf_counter() - start)
         
-        avg_time = statistics.mean(times)
-        p95_time = sorted(times)[int(len(times) * 0.95)]
+        # Plain float arithmetic; exact-fraction averaging isn't needed for timings
+        avg_time = sum(times) / len(times)
+        p95_time = float(np.percentile(times, 95))
         
         print(f"Average response time: {avg_time:.3f}s")
         print(f"95th percentile: {p95_time:.3f}s")
@@ -59,19 +85,31 @@ class PerformanceTestSuite:
     async def test_concurrent_load(self):
         """Test performance under concurrent load"""
         async def search_task(query):
-            start = time.time()
-            await self.search_service.search(f"{query} test", 5)
-            return time.time() - start
+            start = time.perf_counter()
+            await self.search_service.search(f"{query} test", 5, use_cache=False)
+            return time.perf_counter() - start
         
         # Simulate 20 concurrent searches
-        tasks = [search_task(f"query{i}") for i in range(20)]
-        times = await asyncio.gather(*tasks)
+        queries = [f"query{i}" for i in range(20)]
+        lag_samples = []
+        probe = asyncio.create_task(_lag_probe(lag_samples))
+        try:
+            if hasattr(asyncio, "TaskGroup"):
+                # Python 3.11+: lower per-task overhead and cancels siblings on failure
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [tg.create_task(search_task(query)) for query in queries]
+                times = [task.result() for task in tasks]
+            else:
+                times = await asyncio.gather(*(search_task(query) for query in queries))
+        finally:
+            probe.cancel()
         
-        avg_concurrent_time = statistics.mean(times)
+        avg_concurrent_time = float(np.asarray(times, dtype=np.float64).mean())
         print(f"Average time under 20x concurrent load: {avg_concurrent_time:.3f}s")
         
         # Should handle concurrency reasonably well
         assert avg_concurrent_time < 2.0, f"Concurrent performance too slow: {avg_concurrent_time:.3f}s"
+        _check_lag(lag_samples)
         
         return times
     
@@ -80,9 +118,14 @@ class PerformanceTestSuite:
         process = psutil.Process(os.getpid())
         initial_memory = process.memory_info().rss / 1024 / 1024  # MB
         
-        # Run multiple searches
-        for i in range(50):
-            await self.search_service.search(f"test query {i}", 10)
+        # Run multiple searches while sampling event-loop lag
+        lag_samples = []
+        probe = asyncio.create_task(_lag_probe(lag_samples))
+        try:
+            for i in range(50):
+                await self.search_service.search(f"test query {i}", 10, use_cache=False)
+        finally:
+            probe.cancel()
         
         final_memory = process.memory_info().rss / 1024 / 1024  # MB
         memory_increase = final_memory - initial_memory
@@ -91,13 +134,14 @@ class PerformanceTestSuite:
         
         # Memory shouldn't grow excessively
         assert memory_increase < 100, f"Memory leak detected: +{memory_increase:.1f}MB"
+        _check_lag(lag_samples)
         
         return memory_increase
 
 @pytest.mark.asyncio
 class TestPerformance:
     
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def perf_suite(self):
         return PerformanceTestSuite()
     
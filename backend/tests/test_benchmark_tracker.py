@@ -0,0 +1,73 @@
+"""
+BenchmarkTracker regression detection against the quality gate metrics
+"""
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+tests_dir = Path(__file__).parent
+if str(tests_dir) not in sys.path:
+    sys.path.insert(0, str(tests_dir))
+
+from test_config import _REGRESSION_CHECKS, BenchmarkTracker, ContinuousIntegrationHelper
+
+BASELINE = {
+    "environment": "staging",
+    "pass_rate": 0.9,
+    "average_score": 0.6,
+    "avg_response_time": 0.2,
+    "average_precision": 0.8,
+    "average_execution_time": 0.3
+}
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    with BenchmarkTracker(str(tmp_path / "benchmarks.db")) as tracker:
+        for _ in range(3):
+            tracker.save_benchmark(BASELINE)
+        yield tracker
+
+
+def test_every_gate_metric_has_a_regression_check():
+    checked = {name for name, *_ in _REGRESSION_CHECKS}
+    assert set(ContinuousIntegrationHelper.GATE_METRICS.values()) <= checked
+
+
+@pytest.mark.parametrize("metric, value", [
+    ("pass_rate", 0.5),
+    ("average_precision", 0.5),
+    ("average_execution_time", 0.9)
+])
+def test_gated_metric_regression_is_reported(tracker, metric, value):
+    metrics = ContinuousIntegrationHelper.relevant_metrics("staging")
+
+    regressions = tracker.detect_regressions({**BASELINE, metric: value}, metrics=metrics)
+
+    assert len(regressions) == 1
+
+
+def test_stable_run_reports_nothing(tracker):
+    metrics = ContinuousIntegrationHelper.relevant_metrics("staging")
+    assert tracker.detect_regressions(dict(BASELINE), metrics=metrics) == []
+
+
+def _entry(hours_ago, environment, pass_rate):
+    timestamp = (datetime.now() - timedelta(hours=hours_ago)).isoformat()
+    return {"timestamp": timestamp, "environment": environment, "git_commit": "abc",
+            "metrics": {**BASELINE, "environment": environment, "pass_rate": pass_rate}}
+
+
+def test_history_from_both_legacy_files_is_imported(tmp_path):
+    (tmp_path / "benchmarks.json").write_text(json.dumps([_entry(5, "staging", 0.7), _entry(4, "development", 0.6)]))
+    (tmp_path / "benchmarks.jsonl").write_text(json.dumps(_entry(3, "staging", 0.8)) + "\n")
+
+    with BenchmarkTracker(str(tmp_path / "benchmarks.db")) as tracker:
+        assert tracker.get_trend_analysis()["count"] == 3
+        staging = tracker.get_trend_analysis(environment="staging")
+        assert staging["count"] == 2
+        assert staging["trends"]["pass_rate"]["current"] == 0.8
+        assert tracker.get_trend_analysis(days=7)["count"] == 3
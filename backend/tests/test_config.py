@@ -2,11 +2,93 @@
 Test configuration and benchmarking utilities
 """
 
-import json
+import orjson
 import time
-from typing import Dict, List, Any
+import hashlib
+import pickle
+import sqlite3
+from xml.sax.saxutils import escape as xml_escape
+from jinja2 import Environment
+from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from pathlib import Path
+from functools import lru_cache
+import numpy as np
+
+from _semcache import code_fingerprint
+
+# Metrics tracked per benchmark entry
+_TRACKED_METRICS = ("pass_rate", "average_score", "avg_response_time")
+
+# (result key, runs column, value when missing, direction, message); direction
+# is -1 for metrics where higher is worse. Every quality gate metric
+# (ContinuousIntegrationHelper.GATE_METRICS) needs a check here
+_REGRESSION_CHECKS = (
+    ("pass_rate", "pass_rate", 0, 1.0, "Pass rate regression: {:.1%} vs {:.1%}"),
+    ("average_score", "avg_score", 0, 1.0, "Score regression: {:.3f} vs {:.3f}"),
+    ("avg_response_time", "avg_response_time", 999, -1.0, "Performance regression: {:.3f}s vs {:.3f}s"),
+    ("average_precision", "avg_precision", 0, 1.0, "Precision regression: {:.3f} vs {:.3f}"),
+    ("average_execution_time", "avg_execution_time", 999, -1.0, "Execution time regression: {:.3f}s vs {:.3f}s")
+)
+# Result key of each runs metric column
+_METRIC_COLUMNS = tuple((name, column) for name, column, _, _, _ in _REGRESSION_CHECKS)
+
+# Grade staircases: points once a threshold is reached. Below the first step
+# accuracy and quality earn a linear share; response time steps are upper bounds
+_PASS_RATE_STEPS, _PASS_RATE_POINTS = np.array([0.6, 0.7, 0.8, 0.9]), np.array([30, 40, 50, 60])
+_SCORE_STEPS, _SCORE_POINTS = np.array([0.4, 0.5, 0.6, 0.7]), np.array([10, 15, 20, 25])
+_RESPONSE_STEPS, _RESPONSE_POINTS = np.array([0.2, 0.5, 1.0, 2.0]), np.array([15, 12, 8, 5, 2])
+_GRADE_STEPS = np.array([70, 75, 80, 85, 90])
+_GRADE_LABELS = np.array([
+    "C (Major Issues)", "C+ (Needs Improvement)", "B (Satisfactory)",
+    "B+ (Good)", "A (Very Good)", "A+ (Excellent)"
+])
+
+def _staircase(values: np.ndarray, steps: np.ndarray, points: np.ndarray, below: float) -> np.ndarray:
+    reached = np.searchsorted(steps, values, side="right")
+    linear = np.trunc(values * below)
+    return np.where(reached > 0, points[np.maximum(reached - 1, 0)], linear)
+
+def grade_points(pass_rates: Any, avg_scores: Any, avg_responses: Any) -> np.ndarray:
+    """Grade points (0-100) for any number of runs at once"""
+    pass_rates, avg_scores, avg_responses = (
+        np.asarray(values, dtype=np.float64) for values in (pass_rates, avg_scores, avg_responses)
+    )
+    return (
+        _staircase(pass_rates, _PASS_RATE_STEPS, _PASS_RATE_POINTS, 30)   # Accuracy (60% weight)
+        + _staircase(avg_scores, _SCORE_STEPS, _SCORE_POINTS, 10)         # Quality (25% weight)
+        + _RESPONSE_POINTS[np.searchsorted(_RESPONSE_STEPS, avg_responses, side="left")]  # Performance (15% weight)
+    )
+
+def grade_batch(pass_rates: Any, avg_scores: Any, avg_responses: Any) -> np.ndarray:
+    """Grade label of every run"""
+    points = grade_points(pass_rates, avg_scores, avg_responses)
+    return _GRADE_LABELS[np.searchsorted(_GRADE_STEPS, points, side="right")]
+
+def _read_git_head(start: Path) -> Optional[str]:
+    """Commit hash of HEAD read straight from .git, or None if it needs git itself"""
+    for directory in (start, *start.parents):
+        git_dir = directory / ".git"
+        if not git_dir.exists():
+            continue
+        if not git_dir.is_dir():
+            return None  # Worktree or submodule pointer file
+        try:
+            head = (git_dir / "HEAD").read_text().strip()
+            if not head.startswith("ref: "):
+                return head  # Detached HEAD
+            ref = head[len("ref: "):]
+            ref_file = git_dir / ref
+            if ref_file.is_file():
+                return ref_file.read_text().strip()
+            # Refs may only exist in packed-refs after `git gc`
+            for line in (git_dir / "packed-refs").read_text().splitlines():
+                if line.endswith(" " + ref):
+                    return line.split(" ", 1)[0]
+        except OSError:
+            pass
+        return None
+    return None
 
 class TestConfig:
     """Configuration for different test environments"""
@@ -17,21 +99,33 @@ class TestConfig:
             "min_pass_rate": 0.6,
             "min_precision": 0.4,
             "concurrent_users": 5,
-            "test_iterations": 1
+            "test_iterations": 1,
+            "eval_concurrency": 8,
+            # Run the performance tests at the same time; faster, but they
+            # share one search service and DB pool, so timings are inflated
+            "perf_concurrency_safe": True,
+            # Seconds before a hung performance test is cancelled
+            "perf_timeout": 120
         },
         "staging": {
             "max_execution_time": 1.0,
             "min_pass_rate": 0.75,
             "min_precision": 0.6,
             "concurrent_users": 20,
-            "test_iterations": 3
+            "test_iterations": 3,
+            "eval_concurrency": 16,
+            "perf_concurrency_safe": False,
+            "perf_timeout": 60
         },
         "production": {
             "max_execution_time": 0.5,
             "min_pass_rate": 0.85,
             "min_precision": 0.7,
             "concurrent_users": 50,
-            "test_iterations": 5
+            "test_iterations": 5,
+            "eval_concurrency": 16,
+            "perf_concurrency_safe": False,
+            "perf_timeout": 60
         }
     }
     
@@ -42,15 +136,84 @@ class TestConfig:
 class BenchmarkTracker:
     """Track performance over time"""
     
-    def __init__(self, benchmark_file: str = "benchmarks.json"):
+    # Tracked metrics get their own columns so trends and regressions are
+    # indexed queries; the full entry is kept as an orjson payload
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            ts REAL NOT NULL,
+            env TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            git_commit TEXT,
+            pass_rate REAL,
+            avg_score REAL,
+            avg_response_time REAL,
+            payload BLOB NOT NULL,
+            avg_precision REAL,
+            avg_execution_time REAL
+        );
+        CREATE INDEX IF NOT EXISTS ix_runs_env_ts ON runs(env, ts);
+    """
+    
+    def __init__(self, benchmark_file: str = "benchmarks.db"):
         self.benchmark_file = Path(benchmark_file)
-        self.benchmarks = self._load_benchmarks()
+        self.conn = sqlite3.connect(self.benchmark_file)
+        # WAL lets a concurrent CI run write while another reads trends
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(self._SCHEMA)
+            self._add_missing_columns()
+        self._import_legacy_history()
+    
+    def _add_missing_columns(self):
+        """Add metric columns introduced after the database was created"""
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(runs)")}
+        for _, column in _METRIC_COLUMNS:
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE runs ADD COLUMN {column} REAL")
+    
+    def _import_legacy_history(self, legacy_files: tuple = ("benchmarks.json", "benchmarks.jsonl")):
+        """Carry history over from the old JSON array and JSON Lines files into an empty database"""
+        if self.conn.execute("SELECT 1 FROM runs LIMIT 1").fetchone():
+            return
+        entries = []
+        for legacy_file in legacy_files:
+            legacy = self.benchmark_file.with_name(legacy_file)
+            if not legacy.exists():
+                continue
+            data = legacy.read_bytes()
+            if legacy.suffix == ".jsonl":
+                entries.extend(orjson.loads(line) for line in data.splitlines() if line.strip())
+            elif data.strip():
+                entries.extend(orjson.loads(data))
+        entries.sort(key=lambda entry: entry["timestamp"])
+        self._insert(entries)
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self) -> "BenchmarkTracker":
+        return self
     
-    def _load_benchmarks(self) -> List[Dict[str, Any]]:
-        if self.benchmark_file.exists():
-            with open(self.benchmark_file, 'r') as f:
-                return json.load(f)
-        return []
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _insert(self, entries: List[Dict[str, Any]]):
+        rows = [
+            (
+                datetime.fromisoformat(entry["timestamp"]).timestamp(),
+                entry.get("environment", "unknown"),
+                "advanced" if entry["metrics"].get("advanced_mode") else "standard",
+                entry.get("git_commit"),
+                orjson.dumps(entry, option=orjson.OPT_SERIALIZE_NUMPY),
+                *(entry["metrics"].get(name) for name, _ in _METRIC_COLUMNS)
+            )
+            for entry in entries
+        ]
+        columns = ", ".join(["ts", "env", "mode", "git_commit", "payload", *(column for _, column in _METRIC_COLUMNS)])
+        placeholders = ", ".join("?" * (5 + len(_METRIC_COLUMNS)))
+        with self.conn:
+            self.conn.executemany(f"INSERT INTO runs ({columns}) VALUES ({placeholders})", rows)
     
     def save_benchmark(self, results: Dict[str, Any]):
         """Save benchmark results"""
@@ -60,17 +223,15 @@ class BenchmarkTracker:
             "git_commit": self._get_git_commit(),
             "environment": results.get("environment", "unknown")
         }
-        
-        self.benchmarks.append(benchmark_entry)
-        
-        # Keep only last 100 benchmarks
-        self.benchmarks = self.benchmarks[-100:]
-        
-        with open(self.benchmark_file, 'w') as f:
-            json.dump(self.benchmarks, f, indent=2)
+        self._insert([benchmark_entry])
     
-    def _get_git_commit(self) -> str:
-        """Get current git commit hash"""
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _get_git_commit() -> str:
+        """Get current git commit hash (looked up once per process)"""
+        commit = _read_git_head(Path.cwd())
+        if commit:
+            return commit[:8]  # Short hash
         try:
             import subprocess
             result = subprocess.run(
@@ -81,102 +242,119 @@ class BenchmarkTracker:
         except:
             return "unknown"
     
-    def get_trend_analysis(self, days: int = 7) -> Dict[str, Any]:
-        """Analyze performance trends"""
+    def _metric_rows(self, sql: str, params: tuple, missing_time: float) -> np.ndarray:
+        """Tracked metrics of the selected runs as an (N, 3) array, in _TRACKED_METRICS order"""
+        rows = self.conn.execute(
+            f"SELECT COALESCE(pass_rate, 0), COALESCE(avg_score, 0), COALESCE(avg_response_time, ?) {sql}",
+            (missing_time, *params)
+        ).fetchall()
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(_TRACKED_METRICS))
+    
+    def get_trend_analysis(self, days: int = 7, environment: Optional[str] = None) -> Dict[str, Any]:
+        """Analyze performance trends, of one environment's runs when given"""
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        recent_benchmarks = [
-            b for b in self.benchmarks 
-            if datetime.fromisoformat(b["timestamp"]) > cutoff_date
-        ]
+        if environment is None:
+            metrics = self._metric_rows(
+                "FROM runs WHERE ts > ? ORDER BY ts", (cutoff_date.timestamp(),), missing_time=0
+            )
+        else:
+            # Range scan on ix_runs_env_ts
+            metrics = self._metric_rows(
+                "FROM runs WHERE env = ? AND ts > ? ORDER BY ts",
+                (environment, cutoff_date.timestamp()), missing_time=0
+            )
+        recent_count = len(metrics)
         
-        if len(recent_benchmarks) < 2:
-            return {"status": "insufficient_data", "count": len(recent_benchmarks)}
+        if recent_count < 2:
+            return {"status": "insufficient_data", "count": recent_count}
         
-        # Calculate trends
-        pass_rates = [b["metrics"].get("pass_rate", 0) for b in recent_benchmarks]
-        avg_scores = [b["metrics"].get("avg_score", 0) for b in recent_benchmarks]
-        response_times = [b["metrics"].get("avg_response_time", 0) for b in recent_benchmarks]
+        # Calculate trends (at least two entries from here on)
+        pass_rates, avg_scores, response_times = metrics.T
+        points = grade_points(pass_rates, avg_scores, response_times)
+        grades = _GRADE_LABELS[np.searchsorted(_GRADE_STEPS, points, side="right")]
         
         return {
             "status": "analyzed",
-            "count": len(recent_benchmarks),
+            "count": recent_count,
             "trends": {
                 "pass_rate": {
-                    "current": pass_rates[-1] if pass_rates else 0,
-                    "average": sum(pass_rates) / len(pass_rates) if pass_rates else 0,
-                    "trend": "improving" if len(pass_rates) > 1 and pass_rates[-1] > pass_rates[0] else "declining"
+                    "current": float(pass_rates[-1]),
+                    "average": float(pass_rates.mean()),
+                    "trend": "improving" if pass_rates[-1] > pass_rates[0] else "declining"
                 },
                 "avg_score": {
-                    "current": avg_scores[-1] if avg_scores else 0,
-                    "average": sum(avg_scores) / len(avg_scores) if avg_scores else 0,
-                    "trend": "improving" if len(avg_scores) > 1 and avg_scores[-1] > avg_scores[0] else "declining"
+                    "current": float(avg_scores[-1]),
+                    "average": float(avg_scores.mean()),
+                    "trend": "improving" if avg_scores[-1] > avg_scores[0] else "declining"
                 },
                 "response_time": {
-                    "current": response_times[-1] if response_times else 0,
-                    "average": sum(response_times) / len(response_times) if response_times else 0,
-                    "trend": "improving" if len(response_times) > 1 and response_times[-1] < response_times[0] else "declining"
+                    "current": float(response_times[-1]),
+                    "average": float(response_times.mean()),
+                    "trend": "improving" if response_times[-1] < response_times[0] else "declining"
+                },
+                "grade": {
+                    "current": str(grades[-1]),
+                    "history": grades.tolist(),
+                    "trend": "improving" if points[-1] > points[0] else "declining"
                 }
             }
         }
     
-    def detect_regressions(self, current_results: Dict[str, Any], threshold: float = 0.1) -> List[str]:
-        """Detect performance regressions"""
-        if len(self.benchmarks) < 3:
+    def detect_regressions(self, current_results: Dict[str, Any], threshold: float = 0.1,
+                           metrics: Optional[set] = None) -> List[str]:
+        """Detect performance regressions, only in `metrics` when given"""
+        checks = [check for check in _REGRESSION_CHECKS if metrics is None or check[0] in metrics]
+        if not checks:
             return []
         
-        # Get baseline from last 3 runs (excluding current)
-        recent = self.benchmarks[-3:]
-        baseline_pass_rate = sum(b["metrics"].get("pass_rate", 0) for b in recent) / len(recent)
-        baseline_score = sum(b["metrics"].get("avg_score", 0) for b in recent) / len(recent)
-        baseline_time = sum(b["metrics"].get("avg_response_time", 999) for b in recent) / len(recent)
-        
-        regressions = []
-        
-        # Check for regressions
-        current_pass_rate = current_results.get("pass_rate", 0)
-        current_score = current_results.get("avg_score", 0)
-        current_time = current_results.get("avg_response_time", 999)
-        
-        if current_pass_rate < baseline_pass_rate - threshold:
-            regressions.append(f"Pass rate regression: {current_pass_rate:.1%} vs {baseline_pass_rate:.1%}")
-        
-        if current_score < baseline_score - threshold:
-            regressions.append(f"Score regression: {current_score:.3f} vs {baseline_score:.3f}")
-        
-        if current_time > baseline_time * (1 + threshold):
-            regressions.append(f"Performance regression: {current_time:.3f}s vs {baseline_time:.3f}s")
+        # Get baseline from last 3 runs of this environment (excluding current),
+        # loading only the columns being compared
+        columns = ", ".join(f"COALESCE({column}, {missing})" for _, column, missing, _, _ in checks)
+        rows = self.conn.execute(
+            f"SELECT {columns} FROM runs WHERE env = ? ORDER BY ts DESC LIMIT 3",
+            (current_results.get("environment", "unknown"),)
+        ).fetchall()
+        if len(rows) < 3:
+            return []
+        baseline = np.array(rows, dtype=np.float64).mean(axis=0)
         
-        return regressions
+        current = np.array(
+            [current_results.get(name, missing) for name, _, missing, _, _ in checks], dtype=np.float64
+        )
+        # Flip time's sign so every metric regresses by falling below its limit
+        direction = np.array([sign for _, _, _, sign, _ in checks])
+        # Pass rate and score may drop by `threshold`; time may grow by that fraction
+        limits = np.where(direction > 0, baseline - threshold, baseline * (1 + threshold))
+        regressed = direction * current < direction * limits
+        
+        return [
+            checks[i][4].format(current[i], baseline[i])
+            for i in np.flatnonzero(regressed)
+        ]
 
-class TestReportGenerator:
-    """Generate comprehensive test reports"""
-    
-    @staticmethod
-    def generate_html_report(results: Dict[str, Any], output_file: str = "test_report.html"):
-        """Generate HTML test report"""
-        
-        html_template = """<!DOCTYPE html>
+# Compiled once at import; rendered per report
+_HTML_REPORT_TEMPLATE = Environment(autoescape=True).from_string("""<!DOCTYPE html>
 <html>
 <head>
     <title>SmartSearch-AI Test Report</title>
     <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }}
-        .container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-        .header {{ text-align: center; color: #333; border-bottom: 2px solid #4CAF50; padding-bottom: 20px; margin-bottom: 30px; }}
-        .metrics {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }}
-        .metric-card {{ background: #f8f9fa; padding: 20px; border-radius: 8px; text-align: center; border-left: 4px solid #4CAF50; }}
-        .metric-value {{ font-size: 2em; font-weight: bold; color: #4CAF50; }}
-        .metric-label {{ color: #666; margin-top: 5px; }}
-        .test-results {{ margin-top: 30px; }}
-        .test-item {{ background: #fff; border: 1px solid #ddd; margin: 10px 0; padding: 15px; border-radius: 5px; }}
-        .test-item.passed {{ border-left: 4px solid #4CAF50; }}
-        .test-item.failed {{ border-left: 4px solid #f44336; }}
-        .query {{ font-weight: bold; color: #333; }}
-        .details {{ margin-top: 10px; color: #666; font-size: 0.9em; }}
-        .error {{ color: #f44336; background: #ffebee; padding: 5px; border-radius: 3px; margin: 5px 0; }}
-        .timestamp {{ text-align: center; color: #999; margin-top: 30px; }}
-        .grade {{ font-size: 3em; color: #4CAF50; text-align: center; margin: 20px 0; }}
+        body { font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }
+        .container { max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        .header { text-align: center; color: #333; border-bottom: 2px solid #4CAF50; padding-bottom: 20px; margin-bottom: 30px; }
+        .metrics { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }
+        .metric-card { background: #f8f9fa; padding: 20px; border-radius: 8px; text-align: center; border-left: 4px solid #4CAF50; }
+        .metric-value { font-size: 2em; font-weight: bold; color: #4CAF50; }
+        .metric-label { color: #666; margin-top: 5px; }
+        .test-results { margin-top: 30px; }
+        .test-item { background: #fff; border: 1px solid #ddd; margin: 10px 0; padding: 15px; border-radius: 5px; }
+        .test-item.passed { border-left: 4px solid #4CAF50; }
+        .test-item.failed { border-left: 4px solid #f44336; }
+        .query { font-weight: bold; color: #333; }
+        .details { margin-top: 10px; color: #666; font-size: 0.9em; }
+        .error { color: #f44336; background: #ffebee; padding: 5px; border-radius: 3px; margin: 5px 0; }
+        .timestamp { text-align: center; color: #999; margin-top: 30px; }
+        .grade { font-size: 3em; color: #4CAF50; text-align: center; margin: 20px 0; }
     </style>
 </head>
 <body>
@@ -186,75 +364,109 @@ class TestReportGenerator:
             <p>Comprehensive evaluation of semantic search performance</p>
         </div>
         
-        <div class="grade">Grade: {grade}</div>
+        <div class="grade">Grade: {{ grade }}</div>
         
         <div class="metrics">
             <div class="metric-card">
-                <div class="metric-value">{pass_rate}</div>
+                <div class="metric-value">{{ pass_rate }}</div>
                 <div class="metric-label">Pass Rate</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{avg_score:.3f}</div>
+                <div class="metric-value">{{ '%.3f' | format(avg_score) }}</div>
                 <div class="metric-label">Average Score</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{avg_precision:.3f}</div>
+                <div class="metric-value">{{ '%.3f' | format(avg_precision) }}</div>
                 <div class="metric-label">Average Precision</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{avg_time:.3f}s</div>
+                <div class="metric-value">{{ '%.3f' | format(avg_time) }}s</div>
                 <div class="metric-label">Response Time</div>
             </div>
         </div>
         
         <div class="test-results">
             <h2>Test Results</h2>
-            {test_items}
+            {% for result in test_results %}
+            <div class="test-item {{ 'passed' if result.passed else 'failed' }}">
+                <div class="query">{{ '✅' if result.passed else '❌' }} {{ result.get('query', 'Unknown') }}</div>
+                <div class="details">
+                    Score: {{ '%.3f' | format(result.get('score', 0)) }} | 
+                    Precision: {{ '%.3f' | format(result.get('precision', 0)) }} | 
+                    Time: {{ '%.3f' | format(result.get('execution_time', 0)) }}s
+                    {% if result.top_result %}<br>Top Result: {{ result.top_result }}{% endif %}
+                </div>
+                {% for error in result.errors %}<div class="error">{{ error }}</div>{% endfor %}
+            </div>
+            {% endfor %}
         </div>
         
         <div class="timestamp">
-            Generated on {timestamp}
+            Generated on {{ timestamp }}
         </div>
     </div>
 </body>
-</html>"""
-        
-        # Generate test items HTML
-        test_items_html = ""
-        for result in results.get("results", []):
-            status_class = "passed" if result.get("passed", False) else "failed"
-            status_icon = "✅" if result.get("passed", False) else "❌"
-            
-            errors_html = ""
-            if result.get("errors"):
-                errors_html = "".join([f'<div class="error">{error}</div>' for error in result["errors"]])
-            
-            test_items_html += f"""
-            <div class="test-item {status_class}">
-                <div class="query">{status_icon} {result.get('query', 'Unknown')}</div>
-                <div class="details">
-                    Score: {result.get('score', 0):.3f} | 
-                    Precision: {result.get('precision', 0):.3f} | 
-                    Time: {result.get('execution_time', 0):.3f}s
-                    {f"<br>Top Result: {result.get('top_result', 'N/A')}" if result.get('top_result') else ""}
-                </div>
-                {errors_html}
-            </div>
-            """
+</html>""")
+
+class EvaluationCache:
+    """
+    Evaluation results pickled on disk across runs (opt-in with --cache)
+    
+    Keyed by the full test case, the environment, the index version the
+    caller reads from the live store, and a hash of the search and evaluation
+    code, so editing a test case, re-uploading products or changing the
+    ranking code misses. Cached results keep their old execution_time, which
+    callers must not use for timing gates.
+    """
+    
+    def __init__(self, environment: str, index_version: str,
+                 cache_dir: Path = Path(__file__).parent / ".eval_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.environment = environment
+        self.index_version = index_version
+        self.code_version = code_fingerprint()
+    
+    def _path(self, test_case: Any) -> Path:
+        key = hashlib.blake2b(
+            f"{test_case!r}|{self.environment}|{self.index_version}|{self.code_version}".encode(), digest_size=16
+        ).hexdigest()
+        return self.cache_dir / f"{key}.pkl"
+    
+    def get(self, test_case: Any) -> Optional[Any]:
+        try:
+            with open(self._path(test_case), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+    
+    def put(self, test_case: Any, result: Any):
+        # Runs without results usually mean search was down; don't pin those
+        if result.results_count == 0:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._path(test_case), "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+class TestReportGenerator:
+    """Generate comprehensive test reports"""
+    
+    @staticmethod
+    def generate_html_report(results: Dict[str, Any], output_file: str = "test_report.html"):
+        """Generate HTML test report"""
         
         # Calculate metrics
         total_tests = results.get("total_tests", 0)
         passed_tests = results.get("passed", 0)
         pass_rate = f"{passed_tests}/{total_tests} ({passed_tests/total_tests:.1%})" if total_tests > 0 else "0/0 (0%)"
         
-        # Populate template
-        html_content = html_template.format(
+        # Populate template (autoescaped, so query text can't break the markup)
+        html_content = _HTML_REPORT_TEMPLATE.render(
             grade=results.get("grade", "Unknown"),
             pass_rate=pass_rate,
             avg_score=results.get("average_score", 0),
             avg_precision=results.get("average_precision", 0),
             avg_time=results.get("average_execution_time", 0),
-            test_items=test_items_html,
+            test_results=results.get("results", []),
             timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         )
         
@@ -278,20 +490,21 @@ class ContinuousIntegrationHelper:
     </testsuite>
 </testsuites>"""
         
-        test_cases_xml = ""
+        test_cases = []
         for result in results.get("results", []):
             passed = result.get("passed", False)
-            test_name = result.get("query", "unknown").replace('"', '&quot;')
+            test_name = xml_escape(result.get("query", "unknown"), {'"': '&quot;'})
             execution_time = result.get("execution_time", 0)
             
             if passed:
-                test_cases_xml += f'<testcase name="{test_name}" time="{execution_time:.3f}"/>\n        '
+                test_cases.append(f'<testcase name="{test_name}" time="{execution_time:.3f}"/>\n        ')
             else:
-                errors = " | ".join(result.get("errors", []))
-                test_cases_xml += f"""<testcase name="{test_name}" time="{execution_time:.3f}">
+                errors = xml_escape(" | ".join(result.get("errors", [])))
+                test_cases.append(f"""<testcase name="{test_name}" time="{execution_time:.3f}">
             <failure message="Test failed">{errors}</failure>
         </testcase>
-        """
+        """)
+        test_cases_xml = "".join(test_cases)
         
         total_tests = results.get("total_tests", 0)
         failures = results.get("failed", 0)
@@ -309,6 +522,19 @@ class ContinuousIntegrationHelper:
         
         print(f"📊 JUnit XML generated: {output_file}")
     
+    # Result key each quality gate threshold is checked against
+    GATE_METRICS = {
+        "min_pass_rate": "pass_rate",
+        "min_precision": "average_precision",
+        "max_execution_time": "average_execution_time"
+    }
+    
+    @classmethod
+    def relevant_metrics(cls, environment: str = "development") -> set:
+        """Result metrics that can decide this environment's quality gates"""
+        config = TestConfig.get_config(environment)
+        return {metric for gate, metric in cls.GATE_METRICS.items() if gate in config}
+    
     @staticmethod
     def check_quality_gates(results: Dict[str, Any], environment: str = "development") -> bool:
         """Check if results meet quality gates"""
@@ -318,9 +544,8 @@ class ContinuousIntegrationHelper:
         avg_precision = results.get("average_precision", 0)
         avg_time = results.get("average_execution_time", 0)
         
-        gates_passed = []
-        gates_passed.append(pass_rate >= config["min_pass_rate"])
-        gates_passed.append(avg_precision >= config["min_precision"])
-        gates_passed.append(avg_time <= config["max_execution_time"])
+        # Time is negated so every gate is a lower bound
+        values = np.array([pass_rate, avg_precision, -avg_time], dtype=np.float64)
+        minimums = np.array([config["min_pass_rate"], config["min_precision"], -config["max_execution_time"]])
         
-        return all(gates_passed)
+        return bool((values >= minimums).all())
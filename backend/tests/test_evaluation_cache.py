@@ -0,0 +1,52 @@
+"""
+EvaluationCache hits and invalidation
+"""
+import sys
+from collections import namedtuple
+from pathlib import Path
+from types import SimpleNamespace
+
+tests_dir = Path(__file__).parent
+if str(tests_dir) not in sys.path:
+    sys.path.insert(0, str(tests_dir))
+
+from test_config import EvaluationCache
+
+Case = namedtuple("Case", "query expected_categories")
+
+CASE = Case("wireless headphones", ["Electronics"])
+RESULT = SimpleNamespace(query="wireless headphones", passed=True, results_count=5)
+
+
+def test_round_trip(tmp_path):
+    cache = EvaluationCache("staging", "v1", cache_dir=tmp_path)
+    assert cache.get(CASE) is None
+
+    cache.put(CASE, RESULT)
+
+    assert cache.get(CASE) == RESULT
+
+
+def test_any_key_change_misses(tmp_path):
+    EvaluationCache("staging", "v1", cache_dir=tmp_path).put(CASE, RESULT)
+
+    assert EvaluationCache("staging", "v2", cache_dir=tmp_path).get(CASE) is None
+    assert EvaluationCache("production", "v1", cache_dir=tmp_path).get(CASE) is None
+    assert EvaluationCache("staging", "v1", cache_dir=tmp_path).get(CASE._replace(expected_categories=["Audio"])) is None
+
+
+def test_code_change_misses(tmp_path):
+    EvaluationCache("staging", "v1", cache_dir=tmp_path).put(CASE, RESULT)
+
+    cache = EvaluationCache("staging", "v1", cache_dir=tmp_path)
+    cache.code_version = "edited"
+
+    assert cache.get(CASE) is None
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    cache = EvaluationCache("staging", "v1", cache_dir=tmp_path)
+
+    cache.put(CASE, SimpleNamespace(query=CASE.query, passed=False, results_count=0))
+
+    assert cache.get(CASE) is None
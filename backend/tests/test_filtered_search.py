@@ -0,0 +1,45 @@
+"""
+Filtered search against the live database (needs DATABASE_URL and uploaded products)
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="needs a database with uploaded products")
+
+PRODUCTS = json.loads((backend_dir / "data" / "products.json").read_text(encoding="utf-8"))
+
+
+@pytest.fixture(scope="module")
+def vector_store():
+    from app.services.vector_store import get_vector_store
+    return get_vector_store()
+
+
+def test_selective_category_filter_returns_every_match(vector_store):
+    # A category with a single product: the HNSW beam alone would rarely reach it
+    category = min({p["category"] for p in PRODUCTS}, key=lambda c: sum(p["category"] == c for p in PRODUCTS))
+    expected = sum(p["category"] == category for p in PRODUCTS)
+
+    results = vector_store.search_filtered("something to buy", k=10, category=category)
+
+    assert len(results) == min(10, expected)
+    assert all(doc.metadata["category"] == category for doc, _ in results)
+
+
+def test_combined_filters_match_the_catalogue(vector_store):
+    min_rating, max_price = 4.5, 100
+    expected = sum(p["rating"] >= min_rating and p["price"] <= max_price for p in PRODUCTS)
+
+    results = vector_store.search_filtered("gift ideas", k=10, max_price=max_price, min_rating=min_rating)
+
+    assert len(results) == min(10, expected)
+    for doc, _ in results:
+        assert doc.metadata["rating"] >= min_rating and doc.metadata["price"] <= max_price
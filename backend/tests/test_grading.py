@@ -0,0 +1,73 @@
+"""
+Vectorized grade staircase against the original if/elif ladder
+"""
+import itertools
+import sys
+from pathlib import Path
+
+import numpy as np
+
+tests_dir = Path(__file__).parent
+if str(tests_dir) not in sys.path:
+    sys.path.insert(0, str(tests_dir))
+
+from test_config import grade_batch, grade_points
+
+
+def _naive_points(pass_rate, avg_score, avg_response):
+    score = 0
+    if pass_rate >= 0.9: score += 60
+    elif pass_rate >= 0.8: score += 50
+    elif pass_rate >= 0.7: score += 40
+    elif pass_rate >= 0.6: score += 30
+    else: score += int(pass_rate * 30)
+
+    if avg_score >= 0.7: score += 25
+    elif avg_score >= 0.6: score += 20
+    elif avg_score >= 0.5: score += 15
+    elif avg_score >= 0.4: score += 10
+    else: score += int(avg_score * 10)
+
+    if avg_response <= 0.2: score += 15
+    elif avg_response <= 0.5: score += 12
+    elif avg_response <= 1.0: score += 8
+    elif avg_response <= 2.0: score += 5
+    else: score += 2
+    return score
+
+
+def _naive_grade(points):
+    if points >= 90: return "A+ (Excellent)"
+    elif points >= 85: return "A (Very Good)"
+    elif points >= 80: return "B+ (Good)"
+    elif points >= 75: return "B (Satisfactory)"
+    elif points >= 70: return "C+ (Needs Improvement)"
+    else: return "C (Major Issues)"
+
+
+# Every threshold, both sides of it, and values in between
+RATES = [0.0, 0.1, 0.35, 0.39, 0.4, 0.45, 0.5, 0.55, 0.59, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0]
+RESPONSES = [0.0, 0.1, 0.2, 0.21, 0.5, 0.51, 0.9, 1.0, 1.01, 2.0, 2.01, 999]
+
+
+def test_grade_points_match_the_ladder():
+    grid = list(itertools.product(RATES, RATES, RESPONSES))
+    pass_rates, avg_scores, avg_responses = map(np.array, zip(*grid))
+
+    points = grade_points(pass_rates, avg_scores, avg_responses)
+
+    assert points.tolist() == [_naive_points(*run) for run in grid]
+
+
+def test_grade_labels_match_the_ladder():
+    grid = list(itertools.product(RATES, RATES, RESPONSES))
+    pass_rates, avg_scores, avg_responses = map(np.array, zip(*grid))
+
+    labels = grade_batch(pass_rates, avg_scores, avg_responses)
+
+    assert labels.tolist() == [_naive_grade(_naive_points(*run)) for run in grid]
+
+
+def test_scalar_inputs_grade_a_single_run():
+    assert str(grade_batch(0.95, 0.75, 0.1)) == "A+ (Excellent)"
+    assert str(grade_batch(0.0, 0.0, 999)) == "C (Major Issues)"
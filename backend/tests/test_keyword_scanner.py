@@ -0,0 +1,43 @@
+"""
+_KeywordScanner against plain `keyword in text` checks
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+tests_dir = Path(__file__).parent
+if str(tests_dir) not in sys.path:
+    sys.path.insert(0, str(tests_dir))
+
+from rag_test_framework import _KeywordScanner
+
+# Overlapping and nested keywords: the cases a single regex scan can get wrong
+KEYWORDS = ["pro", "professional", "fess", "ion", "office", "off", "ice", "chair", "air", "a.b"]
+
+
+def test_hits_match_substring_checks():
+    scanner = _KeywordScanner()
+    ids = {kw: next(iter(scanner.register([kw]))) for kw in KEYWORDS}
+    rng = np.random.default_rng(0)
+    pieces = KEYWORDS + ["x", " ", "a", "b"]
+
+    for _ in range(500):
+        text = "".join(rng.choice(pieces, size=rng.integers(0, 8)))
+        expected = frozenset(ids[kw] for kw in KEYWORDS if kw in text)
+        assert scanner.hits(text) == expected, text
+
+
+def test_registering_more_keywords_recompiles():
+    scanner = _KeywordScanner()
+    chair = scanner.register(["chair"])
+    assert scanner.hits("office chair") == chair
+
+    desk = scanner.register(["desk"])
+
+    assert scanner.hits("office chair and desk") == chair | desk
+    assert scanner.register(["chair"]) == chair
+
+
+def test_no_keywords_never_hit():
+    assert _KeywordScanner().hits("anything") == frozenset()
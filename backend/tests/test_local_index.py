@@ -0,0 +1,102 @@
+"""
+LocalANNIndex against a naive full sort, and its int8 corpus against the float32 path
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from app.services.local_index import LocalANNIndex, _Int8Corpus
+
+DIM = 384
+
+
+def _unit_rows(rng, n):
+    rows = rng.normal(size=(n, DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_exact_search_matches_full_sort():
+    rng = np.random.default_rng(2)
+    corpus = _unit_rows(rng, 300)
+    documents = [Document(page_content=str(i)) for i in range(len(corpus))]
+    index = LocalANNIndex(DIM, backend="exact")
+    index.build(documents, corpus)
+    queries = _unit_rows(rng, 10)
+
+    for query, batched in zip(queries, index.search_batch(queries, 10)):
+        order = np.argsort(-(corpus @ query))[:10]
+        single = index.search(query, 10)
+        assert [doc.page_content for doc, _ in single] == [str(i) for i in order]
+        assert [doc.page_content for doc, _ in batched] == [str(i) for i in order]
+        np.testing.assert_allclose([d for _, d in single], 1 - (corpus @ query)[order], atol=1e-5)
+
+
+def test_limit_larger_than_corpus_returns_everything():
+    rng = np.random.default_rng(3)
+    corpus = _unit_rows(rng, 4)
+    index = LocalANNIndex(DIM, backend="exact")
+    index.build([Document(page_content=str(i)) for i in range(4)], corpus)
+
+    assert len(index.search(corpus[0], 10)) == 4
+    assert index.search(corpus[0], 10)[0][0].page_content == "0"
+
+
+def test_int8_score_error_is_bounded():
+    rng = np.random.default_rng(0)
+    corpus = _unit_rows(rng, 500)
+    queries = _unit_rows(rng, 20).T
+
+    approx = _Int8Corpus.quantize(corpus) @ queries
+    exact = corpus @ queries
+
+    # Each code is off by at most half a step (absmax / 254), and a unit
+    # query's L1 norm is at most sqrt(dim)
+    bound = np.abs(corpus).max(axis=1) / 254 * np.sqrt(DIM)
+    assert (np.abs(approx - exact) <= bound[:, None] + 1e-6).all()
+
+
+def test_int8_recall_against_float_path():
+    rng = np.random.default_rng(1)
+    corpus = _unit_rows(rng, 2000)
+    documents = [Document(page_content=str(i), metadata={"i": i}) for i in range(len(corpus))]
+    # Queries near corpus rows, like real queries near their products
+    queries = corpus[rng.choice(len(corpus), 50, replace=False)] + 0.05 * _unit_rows(rng, 50)
+
+    exact_index = LocalANNIndex(DIM, backend="exact")
+    int8_index = LocalANNIndex(DIM, backend="exact", quantize=True)
+    exact_index.build(documents, corpus)
+    int8_index.build(documents, corpus)
+
+    k = 10
+    exact = exact_index.search_batch(queries, k)
+    approx = int8_index.search_batch(queries, k)
+    recall = np.mean([
+        len({doc.page_content for doc, _ in a} & {doc.page_content for doc, _ in e}) / k
+        for a, e in zip(approx, exact)
+    ])
+    assert recall >= 0.9
+    # The nearest product is never displaced, and its distance barely moves
+    for a, e in zip(approx, exact):
+        assert a[0][0].page_content == e[0][0].page_content
+        assert abs(a[0][1] - e[0][1]) < 0.01
+
+
+def test_quantization_is_opt_in():
+    assert LocalANNIndex(DIM).quantize is False
+
+
+def test_get_vector_returns_the_stored_row():
+    rng = np.random.default_rng(4)
+    corpus = _unit_rows(rng, 20)
+    documents = [Document(id=f"P{i}", page_content=str(i)) for i in range(len(corpus))]
+    index = LocalANNIndex(DIM, backend="exact")
+    index.build(documents, corpus)
+
+    np.testing.assert_allclose(index.get_vector("P7"), corpus[7], atol=1e-6)
+    assert index.get_vector("missing") is None
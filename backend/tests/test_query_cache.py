@@ -0,0 +1,77 @@
+"""
+SemanticQueryCache against a brute-force reference
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from app.services.query_cache import SemanticQueryCache
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_exact_lookup_ignores_case_and_whitespace():
+    cache = SemanticQueryCache(capacity=4)
+    cache.put("Wireless  Headphones", _unit([1, 0, 0]), 10, ["a", "b"])
+
+    assert cache.get("wireless headphones ", 5) == ["a", "b"]
+    # Results fetched for a smaller limit can't answer a bigger one
+    assert cache.get("wireless headphones", 20) is None
+
+
+def test_price_constraints_never_share_results():
+    cache = SemanticQueryCache(capacity=4, threshold=0.95)
+    embedding = _unit([1, 0.01, 0])
+    cache.put("chairs under $100", embedding, 10, ["cheap chair"])
+
+    # Near-identical embedding, different constraint
+    assert cache.get("chairs under $500", 10) is None
+    assert cache.get_similar("chairs under $500", _unit([1, 0.02, 0]), 10) is None
+    # Nor does an unconstrained query pick up the constrained results
+    assert cache.get_similar("chairs", embedding, 10) is None
+
+
+def test_similar_lookup_respects_threshold():
+    cache = SemanticQueryCache(capacity=4, threshold=0.95)
+    cache.put("office chair", _unit([1, 0, 0]), 10, ["chair"])
+
+    assert cache.get_similar("desk chair", _unit([1, 0.1, 0]), 10) == ["chair"]
+    assert cache.get_similar("standing desk", _unit([1, 1, 0]), 10) is None
+
+
+def test_similar_lookup_matches_brute_force():
+    rng = np.random.default_rng(0)
+    cache = SemanticQueryCache(capacity=64, threshold=0.9)
+    stored = {}
+    for i in range(48):
+        embedding = _unit(rng.normal(size=8))
+        cache.put(f"query {chr(97 + i % 26)}{chr(97 + i // 26)}", embedding, 10, [i])
+        stored[i] = embedding
+
+    for _ in range(200):
+        probe = _unit(rng.normal(size=8))
+        sims = {i: float(e @ probe) for i, e in stored.items()}
+        best = max(sims, key=sims.get)
+        expected = [best] if sims[best] >= 0.9 else None
+        assert cache.get_similar("probe", probe, 10) == expected
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticQueryCache(capacity=2)
+    cache.put("a", _unit([1, 0]), 10, ["a"])
+    cache.put("b", _unit([0, 1]), 10, ["b"])
+    cache.get("a", 10)
+    cache.put("c", _unit([1, 1]), 10, ["c"])
+
+    assert cache.get("b", 10) is None
+    assert cache.get("a", 10) == ["a"]
+    assert cache.get("c", 10) == ["c"]
+    assert len(cache) == 2
@@ -8,7 +8,11 @@ import asyncio
 import sys
 import os
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from types import SimpleNamespace
+import orjson
 
 # Add backend to Python path
 backend_path = Path(__file__).parent.parent
@@ -17,27 +21,83 @@ sys.path.insert(0, str(backend_path))
 tests_path = Path(__file__).parent
 sys.path.insert(0, str(tests_path))
 
-try:
-    from rag_test_framework import RAGEvaluator, TEST_CASES
-    from performance_tests import PerformanceTestSuite
-    from advanced_rag_tests import AdvancedRAGEvaluator, ADVANCED_TEST_CASES
-    from test_config import TestConfig, BenchmarkTracker, TestReportGenerator, ContinuousIntegrationHelper
-except ImportError as e:
-    print(f"Import error: {e}")
-    print("Make sure you're running from the backend directory or the backend/tests directory")
-    sys.exit(1)
+@lru_cache(maxsize=None)
+def _load_suite(advanced: bool):
+    """
+    Import the evaluation modules on first use
+    
+    They pull in the search service and its ML stack, so deferring them until
+    a TestRunner is built keeps --help and argument errors fast.
+    """
+    try:
+        from rag_test_framework import RAGEvaluator, TEST_CASES
+        from performance_tests import PerformanceTestSuite
+        import test_config
+        if advanced:
+            from advanced_rag_tests import AdvancedRAGEvaluator, ADVANCED_TEST_CASES
+    except ImportError as e:
+        print(f"Import error: {e}")
+        print("Make sure you're running from the backend directory or the backend/tests directory")
+        sys.exit(1)
+    
+    return SimpleNamespace(
+        RAGEvaluator=RAGEvaluator,
+        PerformanceTestSuite=PerformanceTestSuite,
+        config=test_config,
+        AdvancedRAGEvaluator=AdvancedRAGEvaluator if advanced else None,
+        test_cases=ADVANCED_TEST_CASES if advanced else TEST_CASES
+    )
+
+def _accuracy_means(accuracy_results):
+    """Passed count and mean score, precision, semantic understanding and execution time"""
+    n = len(accuracy_results)
+    if not n:
+        return 0, 0.0, 0.0, 0.0, 0.0
+    passed = score = precision = semantic = execution = 0.0
+    for result in accuracy_results:
+        passed += result.passed
+        score += result.score
+        # Standard results carry precision, advanced ones precision_at_5 and semantic_understanding
+        precision += getattr(result, 'precision_at_5', getattr(result, 'precision', 0))
+        semantic += getattr(result, 'semantic_understanding', 0.0)
+        execution += result.execution_time
+    return int(passed), score / n, precision / n, semantic / n, execution / n
+
+def install_fast_event_loop():
+    """Drive the runner with uvloop (winloop on Windows) when it is installed, like conftest.py"""
+    from _event_loop import fast_event_loop_policy
+    policy = fast_event_loop_policy()
+    if policy is not None:
+        asyncio.set_event_loop_policy(policy)
+
+# Report files are written here rather than in the default executor, so disk
+# stalls never hold up threads the search service offloads work to
+_IO_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix="report-io")
+
+def _write_json(path, results):
+    Path(path).write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+
+# From this many test cases on, one batched search beats per-query round trips
+BATCH_MIN_TEST_CASES = 8
 
 class TestRunner:
     """Enhanced test runner with advanced features"""
     
-    def __init__(self, environment: str = "development", advanced: bool = False):
+    def __init__(self, environment: str = "development", advanced: bool = False, use_cache: bool = False):
+        suite = _load_suite(advanced)
         self.environment = environment
-        self.config = TestConfig.get_config(environment)
-        self.rag_evaluator = RAGEvaluator()
-        self.advanced_evaluator = AdvancedRAGEvaluator() if advanced else None
-        self.perf_suite = PerformanceTestSuite()
-        self.benchmark_tracker = BenchmarkTracker()
+        self.test_cases = suite.test_cases
+        self.ci_helper = suite.config.ContinuousIntegrationHelper
+        self.report_generator = suite.config.TestReportGenerator
+        self.grade_batch = suite.config.grade_batch
+        self.config = suite.config.TestConfig.get_config(environment)
+        self.rag_evaluator = suite.RAGEvaluator(environment)
+        self.advanced_evaluator = suite.AdvancedRAGEvaluator() if advanced else None
+        self.evaluation_cache = self._evaluation_cache(suite.config, environment) if use_cache else None
+        self.perf_suite = suite.PerformanceTestSuite()
+        self.benchmark_tracker = suite.config.BenchmarkTracker()
         self.advanced_mode = advanced
+        self.results = None
     
     async def run_full_evaluation(self):
         """Enhanced evaluation with advanced features"""
@@ -49,41 +109,67 @@ class TestRunner:
         if self.advanced_mode:
             print("\n🔬 Running Advanced Semantic Search Tests...")
             evaluator = self.advanced_evaluator
-            test_cases = ADVANCED_TEST_CASES
+            test_cases = self.test_cases
         else:
             print("\n📊 Running Standard Semantic Search Tests...")
             evaluator = self.rag_evaluator
-            test_cases = TEST_CASES
-        
-        # Run accuracy tests
-        accuracy_results = []
-        for i, test_case in enumerate(test_cases, 1):
-            print(f"  {i}/{len(test_cases)}: {test_case.query[:50]}")
-            result = await evaluator.evaluate_single_query(test_case)
-            accuracy_results.append(result)
-            
+            test_cases = self.test_cases
+        
+        # Run accuracy tests; unchanged cases come straight from the cache
+        cached = [self.evaluation_cache.get(tc) if self.evaluation_cache else None for tc in test_cases]
+        pending = [tc for tc, result in zip(test_cases, cached) if result is None]
+        if self.evaluation_cache and len(pending) < len(test_cases):
+            print(f"  ♻️  {len(test_cases) - len(pending)} cached results reused (timings come from fresh runs only)")
+        fresh = await self._run_accuracy(evaluator, pending) if pending else []
+        if self.evaluation_cache:
+            for test_case, result in zip(pending, fresh):
+                self.evaluation_cache.put(test_case, result)
+        fresh_iter = iter(fresh)
+        accuracy_results = [result if result is not None else next(fresh_iter) for result in cached]
+        
+        # Report after gathering so output stays in test case order, and
+        # buffer it so the whole block goes out in a single write
+        lines = []
+        total = len(test_cases)
+        for i, (test_case, result) in enumerate(zip(test_cases, accuracy_results), 1):
+            lines.append(f"  {i}/{total}: {test_case.query[:50]}")
             status = "✅" if result.passed else "❌"
             if self.advanced_mode:
-                print(f"    {status} P@5: {result.precision_at_5:.3f} | Semantic: {result.semantic_understanding:.3f}")
+                lines.append(f"    {status} P@5: {result.precision_at_5:.3f} | Semantic: {result.semantic_understanding:.3f}")
             else:
-                print(f"    {status} Score: {result.score:.3f} | Precision: {result.precision:.3f}")
+                lines.append(f"    {status} Score: {result.score:.3f} | Precision: {result.precision:.3f}")
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
         
         # 2. Performance Tests
         print(f"\n⚡ Testing Performance (Environment: {self.environment})...")
-        try:
-            response_times = await self.perf_suite.test_response_time()
-            concurrent_times = await self.perf_suite.test_concurrent_load()
-            memory_usage = await self.perf_suite.test_memory_usage()
-        except Exception as e:
-            print(f"Performance test failed: {e}")
-            response_times = concurrent_times = [999]
-            memory_usage = 999
+        phases = (
+            self.perf_suite.test_response_time,
+            self.perf_suite.test_concurrent_load,
+            self.perf_suite.test_memory_usage
+        )
+        # A failed or hung phase reports its sentinel instead of aborting the run
+        sentinels = ([999], [999], 999)
+        timeout = self.config.get("perf_timeout", 120)
+        # The phases share one connection pool; fill it up front so connection
+        # setup isn't timed as search latency
+        await self._bounded(self.perf_suite.warm_up, timeout, None)
+        bounded = [self._bounded(phase, timeout, sentinel) for phase, sentinel in zip(phases, sentinels)]
+        if self.config.get("perf_concurrency_safe", False):
+            outcomes = await asyncio.gather(*bounded)
+        else:
+            outcomes = [await phase for phase in bounded]
+        response_times, concurrent_times, memory_usage = outcomes
         
         # 3. Generate comprehensive results
-        results = self._compile_results(accuracy_results, response_times, concurrent_times, memory_usage)
+        results = self.results = self._compile_results(accuracy_results, self._timed(evaluator, fresh), response_times, concurrent_times, memory_usage)
         
         # 4. Check for regressions
-        regressions = self.benchmark_tracker.detect_regressions(results)
+        # Only metrics a quality gate reads can change the CI outcome
+        regressions = self.benchmark_tracker.detect_regressions(
+            results, metrics=self.ci_helper.relevant_metrics(self.environment)
+        )
         if regressions:
             print(f"\n⚠️  REGRESSIONS DETECTED:")
             for regression in regressions:
@@ -92,28 +178,74 @@ class TestRunner:
         # 5. Save benchmark
         self.benchmark_tracker.save_benchmark(results)
         
-        # 6. Generate reports
-        self._generate_all_reports(results)
+        # 6. Check quality gates
+        gates_passed = self.ci_helper.check_quality_gates(results, self.environment)
         
-        # 7. Check quality gates
-        gates_passed = ContinuousIntegrationHelper.check_quality_gates(results, self.environment)
+        # 7. Generate reports; a failing CI run only needs what CI consumes
+        if gates_passed or self.environment == "development":
+            await self._generate_full_reports(results)
+        else:
+            await self._generate_ci_report(results)
         
         # 8. Print summary
         self._print_enhanced_summary(results, gates_passed)
         
         return accuracy_results, gates_passed
     
+    def close(self):
+        """Release the benchmark database connection"""
+        self.benchmark_tracker.close()
+    
+    @staticmethod
+    def _timed(evaluator, results):
+        """Results whose execution_time measured a real search (not a semantic disk cache hit)"""
+        hits = getattr(evaluator, "semcache_hits", None)
+        return [r for r in results if r.query not in hits] if hits else results
+    
+    def _evaluation_cache(self, config, environment):
+        """Result cache keyed on the embedding model and the products actually in the store"""
+        from _semcache import index_key
+        return config.EvaluationCache(environment, index_key(self.rag_evaluator.search_service.vector_store))
+    
+    @staticmethod
+    async def _bounded(phase, timeout, fallback):
+        """Run a performance test, cancelled after `timeout` seconds; fallback if it fails"""
+        try:
+            return await asyncio.wait_for(phase(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Performance test {phase.__name__} timed out after {timeout}s")
+        except Exception as e:
+            print(f"Performance test {phase.__name__} failed: {e}")
+        return fallback
+    
+    async def _run_accuracy(self, evaluator, test_cases):
+        """Evaluate test cases batched when the suite is large, otherwise concurrently"""
+        if len(test_cases) >= BATCH_MIN_TEST_CASES:
+            return await self.run_accuracy_batched(evaluator, test_cases)
+        
+        # eval_concurrency caps in-flight queries so rate-limited embedding
+        # backends aren't flooded
+        semaphore = asyncio.Semaphore(self.config.get("eval_concurrency", 16))
+        
+        async def run_test_case(test_case):
+            async with semaphore:
+                return await evaluator.evaluate_single_query(test_case)
+        
+        return await asyncio.gather(*(run_test_case(tc) for tc in test_cases))
+    
+    async def run_accuracy_batched(self, evaluator, test_cases):
+        """Evaluate all test cases with one batched embedding call and one batched index search"""
+        return await evaluator.evaluate_batch(test_cases)
+    
     def _print_summary(self, accuracy_results, response_times, concurrent_times, memory_usage):
         """Print comprehensive test summary"""
         print(f"\n📋 EVALUATION SUMMARY")
         print("=" * 60)
         
         # Accuracy metrics
-        passed_tests = sum(1 for r in accuracy_results if r.passed)
+        passed_tests, avg_score, avg_precision, _, _ = _accuracy_means(accuracy_results)
         total_tests = len(accuracy_results)
         pass_rate = passed_tests / total_tests if total_tests > 0 else 0
-        avg_score = sum(r.score for r in accuracy_results) / total_tests if total_tests > 0 else 0
-        avg_precision = sum(r.precision for r in accuracy_results) / total_tests if total_tests > 0 else 0
         
         # Performance metrics
         avg_response = sum(response_times) / len(response_times) if response_times else 999
@@ -138,42 +270,23 @@ class TestRunner:
     
     def _calculate_grade(self, pass_rate, avg_score, avg_response):
         """Calculate overall system grade"""
-        score = 0
-        
-        # Accuracy component (60% weight)
-        if pass_rate >= 0.9: score += 60
-        elif pass_rate >= 0.8: score += 50
-        elif pass_rate >= 0.7: score += 40
-        elif pass_rate >= 0.6: score += 30
-        else: score += int(pass_rate * 30)
-        
-        # Quality component (25% weight)
-        if avg_score >= 0.7: score += 25
-        elif avg_score >= 0.6: score += 20
-        elif avg_score >= 0.5: score += 15
-        elif avg_score >= 0.4: score += 10
-        else: score += int(avg_score * 10)
-        
-        # Performance component (15% weight)
-        if avg_response <= 0.2: score += 15
-        elif avg_response <= 0.5: score += 12
-        elif avg_response <= 1.0: score += 8
-        elif avg_response <= 2.0: score += 5
-        else: score += 2
-        
-        if score >= 90: return "A+ (Excellent)"
-        elif score >= 85: return "A (Very Good)"
-        elif score >= 80: return "B+ (Good)"
-        elif score >= 75: return "B (Satisfactory)"
-        elif score >= 70: return "C+ (Needs Improvement)"
-        else: return "C (Major Issues)"
+        return str(self.grade_batch(pass_rate, avg_score, avg_response))
     
     def _print_recommendations(self, results, avg_response, avg_precision):
         """Print improvement recommendations"""
         print(f"\n💡 RECOMMENDATIONS:")
         
+        # Failures and category scores in one pass over the results
+        failed_results = []
+        category_performance = {}
+        for result in results:
+            if not result.passed:
+                failed_results.append(result)
+            # This is simplified - you'd need to map queries to categories
+            if "fitness" in result.query.lower():
+                category_performance.setdefault("fitness", []).append(result.score)
+        
         # Check for common failure patterns
-        failed_results = [r for r in results if not r.passed]
         if failed_results:
             print(f"  • {len(failed_results)} tests failed - consider:")
             for result in failed_results[:3]:  # Show top 3 failures
@@ -186,41 +299,53 @@ class TestRunner:
             print(f"  • Slow responses ({avg_response:.2f}s) - consider caching or optimization")
         
         # Check for category gaps
-        category_performance = {}
-        for result in results:
-            # This is simplified - you'd need to map queries to categories
-            if "fitness" in result.query.lower():
-                category_performance.setdefault("fitness", []).append(result.score)
-        
         for category, scores in category_performance.items():
             avg_cat_score = sum(scores) / len(scores)
             if avg_cat_score < 0.4:
                 print(f"  • Weak performance in {category} queries - add more diverse products")
         
-        if all(r.passed for r in results):
+        if not failed_results:
             print(f"  🎉 All tests passed! Your semantic search is working well.")
             print(f"  📈 Consider adding more complex test cases for edge cases.")
     
-    def _compile_results(self, accuracy_results, response_times, concurrent_times, memory_usage):
-        """Compile comprehensive results"""
-        passed_tests = sum(1 for r in accuracy_results if r.passed)
+    def _compile_results(self, accuracy_results, timed_results, response_times, concurrent_times, memory_usage):
+        """Compile comprehensive results; only timed_results (evaluated this run) count towards timings"""
+        passed_tests, avg_score, avg_precision, avg_semantic, _ = _accuracy_means(accuracy_results)
         total_tests = len(accuracy_results)
         pass_rate = passed_tests / total_tests if total_tests > 0 else 0
         
-        if self.advanced_mode:
-            avg_score = sum(r.score for r in accuracy_results) / total_tests if total_tests > 0 else 0
-            avg_precision = sum(r.precision_at_5 for r in accuracy_results) / total_tests if total_tests > 0 else 0
-            avg_semantic = sum(r.semantic_understanding for r in accuracy_results) / total_tests if total_tests > 0 else 0
-        else:
-            avg_score = sum(r.score for r in accuracy_results) / total_tests if total_tests > 0 else 0
-            avg_precision = sum(r.precision for r in accuracy_results) / total_tests if total_tests > 0 else 0
-            avg_semantic = 0.0
-        
         avg_response = sum(response_times) / len(response_times) if response_times else 999
         avg_concurrent = sum(concurrent_times) / len(concurrent_times) if concurrent_times else 999
+        # Cached results carry timings from an earlier run; with nothing
+        # evaluated fresh, this run's measured response time stands in
+        avg_execution = _accuracy_means(timed_results)[4] if timed_results else avg_response
         
         grade = self._calculate_grade(pass_rate, avg_score, avg_response)
         
+        # The result type is fixed by the mode, so pick its projection once
+        if self.advanced_mode:
+            def project(r):
+                return {
+                    "query": r.query,
+                    "passed": r.passed,
+                    "score": r.score,
+                    "precision": r.precision_at_5,
+                    "top_result": r.top_3_results[0] if r.top_3_results else "No results",
+                    "execution_time": r.execution_time,
+                    "errors": r.errors
+                }
+        else:
+            def project(r):
+                return {
+                    "query": r.query,
+                    "passed": r.passed,
+                    "score": r.score,
+                    "precision": r.precision,
+                    "top_result": r.top_result,
+                    "execution_time": r.execution_time,
+                    "errors": r.errors
+                }
+        
         return {
             "environment": self.environment,
             "advanced_mode": self.advanced_mode,
@@ -231,43 +356,36 @@ class TestRunner:
             "average_score": avg_score,
             "average_precision": avg_precision,
             "average_semantic_understanding": avg_semantic,
-            "average_execution_time": sum(r.execution_time for r in accuracy_results) / total_tests if total_tests > 0 else 0,
+            "average_execution_time": avg_execution,
             "avg_response_time": avg_response,
             "avg_concurrent_time": avg_concurrent,
             "memory_usage": memory_usage,
             "grade": grade,
-            "results": [
-                {
-                    "query": r.query,
-                    "passed": r.passed,
-                    "score": r.score,
-                    "precision": getattr(r, 'precision_at_5', getattr(r, 'precision', 0)),
-                    "top_result": getattr(r, 'top_3_results', [r.top_result])[0] if hasattr(r, 'top_3_results') and r.top_3_results else r.top_result,
-                    "execution_time": r.execution_time,
-                    "errors": r.errors
-                }
-                for r in accuracy_results
-            ]
+            "results": list(map(project, accuracy_results))
         }
     
-    def _generate_all_reports(self, results):
-        """Generate all report formats"""
-        # JSON report
-        import json
-        with open("comprehensive_test_results.json", "w") as f:
-            json.dump(results, f, indent=2)
-        
-        # HTML report
-        TestReportGenerator.generate_html_report(results, "test_report.html")
-        
-        # JUnit XML for CI
-        ContinuousIntegrationHelper.generate_junit_xml(results, "test_results.xml")
+    async def _generate_ci_report(self, results):
+        """Generate the JSON report and JUnit XML for CI"""
+        loop = asyncio.get_running_loop()
+        # Each writer owns its file, so one can format while another is blocked on I/O
+        await asyncio.gather(
+            loop.run_in_executor(_IO_POOL, _write_json, "comprehensive_test_results.json", results),
+            loop.run_in_executor(_IO_POOL, self.ci_helper.generate_junit_xml, results, "test_results.xml")
+        )
         
         print(f"📄 Reports generated:")
         print(f"  - comprehensive_test_results.json")
-        print(f"  - test_report.html")
         print(f"  - test_results.xml")
     
+    async def _generate_full_reports(self, results):
+        """Generate the CI reports plus the HTML report"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            self._generate_ci_report(results),
+            loop.run_in_executor(_IO_POOL, self.report_generator.generate_html_report, results, "test_report.html")
+        )
+        print(f"  - test_report.html")
+    
     def _print_enhanced_summary(self, results, gates_passed):
         """Print enhanced summary with quality gates"""
         print(f"\n📋 COMPREHENSIVE EVALUATION SUMMARY")
@@ -292,13 +410,14 @@ class TestRunner:
         print(f"\nOverall Grade: {results['grade']}")
         
         # Show trend analysis
-        trend_analysis = self.benchmark_tracker.get_trend_analysis()
+        trend_analysis = self.benchmark_tracker.get_trend_analysis(environment=self.environment)
         if trend_analysis["status"] == "analyzed":
             print(f"\n📈 Trend Analysis (Last 7 days):")
             trends = trend_analysis["trends"]
             print(f"  Pass Rate: {trends['pass_rate']['trend']}")
             print(f"  Score: {trends['avg_score']['trend']}")
             print(f"  Performance: {trends['response_time']['trend']}")
+            print(f"  Grade: {trends['grade']['trend']}")
         
         # Environment-specific recommendations
         config = self.config
@@ -313,6 +432,63 @@ class TestRunner:
         if gates_passed:
             print(f"  🎉 All quality gates passed for {self.environment} environment!")
 
+async def serve(socket_path: str, use_cache: bool = False):
+    """
+    Serve evaluation requests over a unix socket from one warm process
+    
+    Each connection sends one JSON line, {"environment": ..., "advanced": ...},
+    and gets back one JSON line with the compiled results and gate outcome.
+    Runners are kept per (environment, advanced), so evaluators, the model and
+    the index load once. Requests run one at a time since every run writes
+    the same report files.
+    """
+    runners = {}
+    lock = asyncio.Lock()
+    
+    async def handle(reader, writer):
+        try:
+            request = orjson.loads(await reader.readline())
+            key = (request.get("environment", "development"), bool(request.get("advanced", False)))
+            async with lock:
+                if key not in runners:
+                    runners[key] = TestRunner(environment=key[0], advanced=key[1], use_cache=use_cache)
+                runner = runners[key]
+                _, gates_passed = await runner.run_full_evaluation()
+            response = {"results": runner.results, "gates_passed": gates_passed}
+        except Exception as e:
+            response = {"error": str(e)}
+        writer.write(orjson.dumps(response, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+        await writer.drain()
+        writer.close()
+    
+    server = await asyncio.start_unix_server(handle, path=socket_path, limit=2 ** 24)
+    print(f"🛰️  Serving evaluation requests on {socket_path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for runner in runners.values():
+            runner.close()
+
+async def run_client(socket_path: str, environment: str, advanced: bool) -> int:
+    """Run an evaluation on a --serve process and report its outcome"""
+    reader, writer = await asyncio.open_unix_connection(socket_path, limit=2 ** 24)
+    writer.write(orjson.dumps({"environment": environment, "advanced": advanced}) + b"\n")
+    await writer.drain()
+    response = orjson.loads(await reader.readline())
+    writer.close()
+    
+    if "error" in response:
+        print(f"\n❌ Testing failed: {response['error']}")
+        return 1
+    results = response["results"]
+    print(f"✅ Passed: {results['passed']}/{results['total_tests']} ({results['pass_rate']:.1%})")
+    print(f"📊 Average Score: {results['average_score']:.3f} | Grade: {results['grade']}")
+    if not response["gates_passed"]:
+        print(f"❌ Quality gates failed for {environment} environment")
+        return 1
+    return 0
+
 async def main():
     """Enhanced main function with argument parsing"""
     parser = argparse.ArgumentParser(description="SmartSearch-AI Testing Suite")
@@ -322,10 +498,22 @@ async def main():
                        help="Run advanced tests with detailed metrics")
     parser.add_argument("--benchmark", "-b", action="store_true", 
                        help="Run continuous benchmarking")
+    parser.add_argument("--cache", action="store_true", 
+                       help="Reuse results of unchanged test cases from earlier runs (timing gates still use fresh runs)")
+    parser.add_argument("--serve", metavar="SOCKET",
+                       help="Keep models loaded and serve evaluation requests on a unix socket")
+    parser.add_argument("--client", metavar="SOCKET",
+                       help="Send this evaluation to a --serve process instead of running it here")
     
     args = parser.parse_args()
     
-    runner = TestRunner(environment=args.environment, advanced=args.advanced)
+    if args.client:
+        return await run_client(args.client, args.environment, args.advanced)
+    if args.serve:
+        await serve(args.serve, use_cache=args.cache)
+        return 0
+    
+    runner = TestRunner(environment=args.environment, advanced=args.advanced, use_cache=args.cache)
     
     print(f"SmartSearch-AI Testing Suite v2.0")
     print(f"Environment: {args.environment.upper()}")
@@ -336,7 +524,7 @@ async def main():
         if args.benchmark:
             # Run continuous benchmarking
             from rag_test_framework import ContinuousBenchmark
-            benchmark = ContinuousBenchmark()
+            benchmark = ContinuousBenchmark(args.environment, evaluator=runner.rag_evaluator)
             await benchmark.run_benchmark()
         else:
             # Run full evaluation
@@ -354,9 +542,12 @@ async def main():
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        runner.close()
     
     return 0
 
 if __name__ == "__main__":
+    install_fast_event_loop()
     exit_code = asyncio.run(main())
     sys.exit(exit_code)
\ No newline at end of file